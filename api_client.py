@@ -1,12 +1,164 @@
+import copy
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from json import JSONDecodeError, JSONDecoder
+from urllib.parse import urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
 from flask import session
 
-from auth_config import pyrebase_auth
+from circuit_breaker import CircuitBreaker
+import metrics
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se conserva en caché la respuesta GET de cada recurso.
+DEFAULT_CACHE_TTLS = {
+    "empleados/": 60,
+    "dispositivos/": 30,
+    "notificaciones/": 300,
+}
+
+# Timeouts (conexión, lectura) en segundos por prefijo de endpoint; "" aplica a todos.
+DEFAULT_TIMEOUTS = {
+    "": (3.05, 10),
+    "dispositivos/getAllDispositivos": (3.05, 30),
+}
+
+# Estados HTTP con los que se reintenta un GET (el backend no llegó a responder).
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Segundos que se guarda la última respuesta buena de cada GET para servirla
+# mientras el backend no responde.
+LAST_GOOD_TTL = 24 * 3600
+
+# Segmentos iniciales del endpoint que forman la operación; el resto son IDs.
+# Por defecto son dos (recurso/operación, p. ej. empleados/getEmpleados);
+# los recursos que se piden por registro (usuarios/<uid>) se listan aparte.
+SEGMENTOS_OPERACION = 2
+SEGMENTOS_OPERACION_POR_RECURSO = {
+    "usuarios": 1,
+}
+
+
+def metric_endpoint(endpoint):
+    """Endpoint sin IDs, para no crear una serie de métricas por registro."""
+    partes = endpoint.split("/")
+    segmentos = SEGMENTOS_OPERACION_POR_RECURSO.get(partes[0], SEGMENTOS_OPERACION)
+    return "/".join(parte if i < segmentos else ":id" for i, parte in enumerate(partes))
+
+
+_SEPARADORES = re.compile(r"[\s,]*")
+_SEPARADORES_NUMERO = re.compile(r"[\s,\]]")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(bloques):
+    """Decodifica un arreglo JSON que llega en bloques de texto, elemento por elemento.
+
+    Solo mantiene en memoria el elemento en curso, no el arreglo completo.
+    Lanza ValueError si el contenido no es un arreglo o llega incompleto.
+    """
+    decoder = JSONDecoder()
+    buffer = ""
+    dentro = False
+    for bloque in bloques:
+        buffer += bloque
+        pos = _SEPARADORES.match(buffer).end() if not dentro else 0
+        if not dentro:
+            if pos == len(buffer):
+                buffer = ""
+                continue
+            if buffer[pos] != "[":
+                raise ValueError("La respuesta no es un arreglo JSON.")
+            dentro = True
+            pos += 1
+        while True:
+            pos = _SEPARADORES.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                elemento, fin = decoder.raw_decode(buffer, pos)
+            except JSONDecodeError:
+                break
+            if isinstance(elemento, (int, float)) and not _SEPARADORES_NUMERO.match(buffer, fin):
+                # Un número que llega hasta el final del bloque puede seguir en el siguiente.
+                break
+            pos = fin
+            yield elemento
+        buffer = buffer[pos:]
+    raise ValueError("El arreglo JSON llegó incompleto.")
+
+
+def _por_prefijo(tabla, endpoint):
+    """Valor del prefijo más específico de `tabla` que coincide con `endpoint` (None si ninguno)."""
+    prefijos = [prefijo for prefijo in tabla if endpoint.startswith(prefijo)]
+    if not prefijos:
+        return None
+    return tabla[max(prefijos, key=len)]
 
 
 class APIClient:
-    def __init__(self, base_url):
+    def __init__(self, base_url, pool_size=10, pool_block=False, cache_ttls=None, cache_size=256,
+                 timeouts=None, max_retries=2, backoff=0.25, max_backoff=2.0,
+                 breaker_threshold=5, breaker_wait=30, last_good_ttl=LAST_GOOD_TTL):
         self.base_url = base_url
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.cache_ttls = DEFAULT_CACHE_TTLS if cache_ttls is None else cache_ttls
+        self.cache = ResponseCache(max_entries=cache_size)
+        self.timeouts = DEFAULT_TIMEOUTS if timeouts is None else timeouts
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_wait = breaker_wait
+        self.last_good_ttl = last_good_ttl
+        self.last_good = ResponseCache(max_entries=cache_size)
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        self._vuelos = SingleFlight("api", copiar=False)
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        """Devuelve la sesión HTTP compartida del proceso (conexiones keep-alive).
+
+        Se crea de nuevo si el proceso fue bifurcado (workers pre-fork), ya que
+        los sockets del padre no deben reutilizarse en el hijo.
+        """
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    http = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_size,
+                        pool_maxsize=self.pool_size,
+                        pool_block=self.pool_block
+                    )
+                    http.mount("https://", adapter)
+                    http.mount("http://", adapter)
+                    self._session = http
+                    self._session_pid = pid
+        return self._session
+
+    def close(self):
+        """Cierra las conexiones abiertas del pool."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
     def _get_headers(self):
         """Obtiene los encabezados con el token de autorización."""
@@ -18,62 +170,235 @@ class APIClient:
             "Content-Type": "application/json"
         }
 
+    def _cache_ttl(self, endpoint):
+        """TTL del prefijo más específico que coincide con `endpoint` (None si no se cachea)."""
+        return _por_prefijo(self.cache_ttls, endpoint)
+
+    def _timeout(self, endpoint):
+        """Timeouts (conexión, lectura) para `endpoint`."""
+        return _por_prefijo(self.timeouts, endpoint)
+
+    def _breaker(self, url):
+        """Circuito del host de `url` (uno por host, compartido entre hilos)."""
+        host = urlparse(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, umbral_fallos=self.breaker_threshold, espera=self.breaker_wait)
+                self._breakers[host] = breaker
+            return breaker
+
+    def _esperar_reintento(self, intento):
+        """Backoff exponencial con jitter completo antes del reintento número `intento`."""
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (intento - 1))))
+
+    def _cache_key(self, endpoint, params):
+        """Clave de caché: ámbito del token que llama, endpoint y parámetros."""
+        id_token = session.get("idToken") or ""
+        scope = hashlib.sha256(id_token.encode()).hexdigest()[:16]
+        return (scope, endpoint, tuple(sorted((params or {}).items())))
+
+    def _invalidate(self, endpoint):
+        """Descarta los GET cacheados del mismo recurso tras una escritura."""
+        recurso = endpoint.split("/", 1)[0] + "/"
+        self.cache.invalidate(lambda key: key[1].startswith(recurso))
+        # La última respuesta buena ya no refleja el recurso tras la escritura.
+        self.last_good.invalidate(lambda key: key[1].startswith(recurso))
+
+    def _request(self, method, endpoint, reintentos=0, **kwargs):
+        """Realiza una solicitud a la API usando el pool de conexiones.
+
+        Devuelve el JSON de la respuesta, o None si la solicitud no tuvo éxito.
+        """
+        return self._enviar(method, endpoint, reintentos, **kwargs)[0]
+
+    def _enviar(self, method, endpoint, reintentos=0, **kwargs):
+        """Hace la solicitud y devuelve (JSON o None, falla_transitoria, cuerpo).
+
+        Reintenta hasta `reintentos` veces los errores de red, timeouts y
+        RETRY_STATUSES (solo debe pedirse para métodos idempotentes). Si el
+        circuito del host está abierto no se envía nada. `falla_transitoria`
+        es True cuando el backend no llegó a dar una respuesta válida (circuito
+        abierto, error de red, timeout o 5xx) y False si respondió, aunque sea
+        rechazando la solicitud (4xx). `cuerpo` son los bytes de la respuesta
+        exitosa (None si falló).
+        """
+        url = f"{self.base_url}/{endpoint}"
+        headers = self._get_headers()
+        breaker = self._breaker(url)
+        kwargs.setdefault("timeout", self._timeout(endpoint))
+
+        for intento in range(reintentos + 1):
+            if intento:
+                metrics.api_retries.inc(metric_endpoint(endpoint))
+                self._esperar_reintento(intento)
+            if not breaker.permitir():
+                logger.warning("Circuito abierto para %s: no se envía %s %s.", breaker.nombre, method, endpoint)
+                return None, True, None
+
+            inicio = time.perf_counter()
+            status = "error"
+            try:
+                response = self._get_session().request(method, url, headers=headers, **kwargs)
+                status = str(response.status_code)
+            except requests.exceptions.RequestException as e:
+                breaker.fallo()
+                logger.warning("Error %s %s (intento %s): %s", method, endpoint, intento + 1, e)
+                continue
+            finally:
+                metrics.api_request_seconds.observe(
+                    time.perf_counter() - inicio, metric_endpoint(endpoint), method, status
+                )
+
+            if response.status_code >= 500:
+                breaker.fallo()
+            else:
+                breaker.exito()
+            if response.status_code in RETRY_STATUSES and intento < reintentos:
+                logger.warning("Error %s %s (intento %s): HTTP %s", method, endpoint, intento + 1, status)
+                continue
+
+            try:
+                response.raise_for_status()
+                return response.json(), False, response.content
+            except requests.exceptions.RequestException as e:
+                logger.warning("Error %s %s: %s", method, endpoint, e)
+                return None, response.status_code >= 500, None
+        return None, True, None
+
+    def _mutate(self, method, endpoint, **kwargs):
+        try:
+            return self._request(method, endpoint, **kwargs)
+        finally:
+            self._invalidate(endpoint)
+
     def get(self, endpoint, params=None):
-        """Realiza una solicitud GET a la API."""
+        """Realiza una solicitud GET a la API (cacheada según `cache_ttls`).
+
+        Si el backend no responde (circuito abierto, error de red, timeout o
+        5xx) devuelve la última respuesta buena del mismo GET cuando la hay, o
+        None. Si el backend rechaza la solicitud (4xx) devuelve None. Los GET
+        idénticos (mismo token, endpoint y parámetros) que coinciden en el
+        tiempo comparten una sola solicitud.
+
+        La respuesta se comparte con la caché y con otros llamadores: es de
+        solo lectura.
+        """
+        ttl = self._cache_ttl(endpoint)
+        key = self._cache_key(endpoint, params)
+        if ttl is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        return self._vuelos.do(key, lambda: self._fetch_get(endpoint, params, key, ttl))
+
+    def _fetch_get(self, endpoint, params, key, ttl):
+        """Hace el GET, lo guarda en las cachés y recurre a la última respuesta buena si falla."""
+        response, transitoria, cuerpo = self._enviar("GET", endpoint, reintentos=self.max_retries, params=params)
+        if response is None:
+            if not transitoria:
+                # El backend rechazó la solicitud (token vencido, recurso borrado...).
+                self.last_good.invalidate(lambda clave: clave == key)
+                return None
+            ultima = self.last_good.get(key)
+            if ultima is not None:
+                metrics.api_stale_responses.inc(metric_endpoint(endpoint))
+                logger.warning("Sirviendo la última respuesta buena de GET %s.", endpoint)
+            return ultima
+
+        if ttl is not None:
+            self.cache.set(key, response, ttl)
+            huella = hashlib.sha256(cuerpo).hexdigest()[:32]
+            self.cache.set(key + ("marca",), (huella, datetime.now(timezone.utc)), ttl)
+        self.last_good.set(key, response, self.last_good_ttl)
+        return response
+
+    def marca(self, endpoint, params=None):
+        """(hash del contenido, momento de la descarga) del GET cacheado, o None si no está vigente.
+
+        Permite responder 304 sin volver a pedir ni renderizar los datos.
+        """
+        return self.cache.get(self._cache_key(endpoint, params) + ("marca",))
+
+    def stream(self, endpoint, params=None):
+        """Recorre los elementos de un GET que devuelve un arreglo JSON sin cargarlo entero.
+
+        No usa la caché. Los errores de red o HTTP se propagan como
+        `requests.exceptions.RequestException`.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        headers = self._get_headers()
+        breaker = self._breaker(url)
+        if not breaker.permitir():
+            raise requests.exceptions.ConnectionError(f"Circuito abierto para {breaker.nombre}.")
+
+        inicio = time.perf_counter()
+        status = "error"
         try:
-            url = f"{self.base_url}/{endpoint}"
-            headers = self._get_headers()
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error GET {endpoint}: {e}")
+            try:
+                response = self._get_session().get(
+                    url, headers=headers, params=params, stream=True, timeout=self._timeout(endpoint)
+                )
+            except requests.exceptions.RequestException:
+                breaker.fallo()
+                raise
+            status = str(response.status_code)
+            if response.status_code >= 500:
+                breaker.fallo()
+            else:
+                breaker.exito()
+            with response:
+                response.raise_for_status()
+                response.encoding = response.encoding or "utf-8"
+                yield from iter_json_array(
+                    response.iter_content(STREAM_CHUNK_SIZE, decode_unicode=True)
+                )
+        finally:
+            metrics.api_request_seconds.observe(
+                time.perf_counter() - inicio, metric_endpoint(endpoint), "GET", status
+            )
+
+    def get_by_id(self, endpoint, record_id, data_key=None, default=None):
+        """Busca un registro por ID en el listado de `endpoint`.
+
+        El listado se descarga una vez y se guarda en caché como un índice
+        {id: registro}; las búsquedas siguientes no vuelven a recorrerlo ni a
+        pedirlo mientras siga vigente. `data_key` indica la clave que contiene
+        la lista cuando la respuesta viene envuelta (p. ej. {"data": [...]}).
+        Devuelve `default` si el ID no existe y None si falló la consulta. El
+        registro devuelto es una copia propia (las vistas de edición lo
+        modifican), hecha solo de ese registro y no del listado.
+        """
+        ttl = self._cache_ttl(endpoint)
+        index_key = self._cache_key(endpoint, None) + ("index",)
+        if ttl is not None:
+            found, record = self.cache.get_item(index_key, record_id)
+            if found:
+                return default if record is None else copy.deepcopy(record)
+
+        response = self.get(endpoint)
+        if response is None:
             return None
+        registros = response.get(data_key, []) if data_key else response
+        index = {registro.get("id"): registro for registro in registros}
+        if ttl is not None:
+            self.cache.set(index_key, index, ttl)
+        record = index.get(record_id)
+        return default if record is None else copy.deepcopy(record)
 
     def post(self, endpoint, data=None, json=None):
         """Realiza una solicitud POST a la API."""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            headers = self._get_headers()
-            response = requests.post(url, json=json, data=data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error POST {endpoint}: {e}")
-            return None
+        return self._mutate("POST", endpoint, json=json, data=data)
 
     def put(self, endpoint, data=None, json=None):
         """Realiza una solicitud PUT a la API."""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            headers = self._get_headers()
-            response = requests.put(url, json=json, data=data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error PUT {endpoint}: {e}")
-            return None
+        return self._mutate("PUT", endpoint, json=json, data=data)
 
     def delete(self, endpoint, data=None, json=None):
         """Realiza una solicitud DELETE a la API."""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            headers = self._get_headers()
-            response = requests.delete(url, json=json, data=data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error DELETE {endpoint}: {e}")
-            return None
+        return self._mutate("DELETE", endpoint, json=json, data=data)
 
     def patch(self, endpoint, json=None, data=None):
         """Realiza una solicitud PATCH a la API."""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            headers = self._get_headers()
-            response = requests.patch(url, json=json, data=data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error PATCH {endpoint}: {e}")
-            return None
+        return self._mutate("PATCH", endpoint, json=json, data=data)
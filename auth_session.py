@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import secrets
+import time
+
+from firebase_admin import auth
+
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Colección con los refresh tokens, por sesión; la cookie solo lleva un ID opaco.
+COLECCION_SESIONES = 'sesiones'
+
+
+class AuthManager:
+    """Valida la sesión de los empleados sin consultas extra por petición.
+
+    Los ID tokens se verifican localmente con `verify_id_token` (las claves
+    públicas de Google quedan en la caché HTTP de firebase_admin) y se
+    renuevan con el refresh token de pyrebase antes de que venzan. El refresh
+    token no viaja en la cookie de sesión: se guarda en Firestore bajo el
+    hash de un ID de sesión aleatorio (`session['sid']`). El perfil del
+    empleado (`nombre`, `is_admin`) se guarda por uid durante `perfil_ttl`.
+    """
+
+    def __init__(self, db, pyrebase_auth, perfil_ttl=300, margen_refresco=300, max_entries=1024):
+        self.db = db
+        self.pyrebase_auth = pyrebase_auth
+        self.perfil_ttl = perfil_ttl
+        self.margen_refresco = margen_refresco
+        self.perfiles = ResponseCache(max_entries=max_entries)
+        self.verificados = ResponseCache(max_entries=max_entries)
+
+    def verificar(self, id_token):
+        """Devuelve los claims del token o lanza un error de firebase_admin.auth.
+
+        El resultado se recuerda hasta que el token vence, así cada petición
+        no repite la verificación de la firma.
+        """
+        clave = hashlib.sha256(id_token.encode()).hexdigest()
+        claims = self.verificados.get(clave)
+        if claims is not None:
+            return claims
+
+        claims = auth.verify_id_token(id_token, clock_skew_seconds=10)
+        restante = claims['exp'] - time.time()
+        if restante > 0:
+            self.verificados.set(clave, claims, restante)
+        return claims
+
+    def perfil(self, uid, email):
+        """Perfil del empleado ({'nombre', 'is_admin'}) o None si no existe."""
+        perfil = self.perfiles.get(uid)
+        if perfil is not None:
+            return perfil
+
+        query = self.db.collection('empleados').where('email', '==', email).limit(1).stream()
+        empleado_data = next((doc.to_dict() for doc in query), None)
+        if not empleado_data:
+            return None
+
+        perfil = {'nombre': empleado_data['nombre'], 'is_admin': empleado_data['is_admin']}
+        self.perfiles.set(uid, perfil, self.perfil_ttl)
+        return perfil
+
+    def iniciar(self, session, user):
+        """Verifica el resultado de `sign_in_with_email_and_password` y llena la sesión.
+
+        Devuelve el perfil del empleado o None si no está registrado.
+        """
+        claims = self.verificar(user['idToken'])
+        perfil = self.perfil(claims['uid'], claims.get('email'))
+        if perfil is None:
+            return None
+
+        self.cerrar(session)
+        session['nombreEmpleado'] = perfil['nombre']
+        session['is_admin'] = perfil['is_admin']
+        session['idToken'] = user['idToken']
+        session['tokenExp'] = claims['exp']
+        if user.get('refreshToken'):
+            sid = secrets.token_urlsafe(32)
+            self._sesion_ref(sid).set({
+                'refresh_token': user['refreshToken'],
+                'uid': claims['uid'],
+                'creada': time.time(),
+            })
+            session['sid'] = sid
+        return perfil
+
+    def _sesion_ref(self, sid):
+        return self.db.collection(COLECCION_SESIONES).document(hashlib.sha256(sid.encode()).hexdigest())
+
+    def _refrescar(self, session):
+        sid = session.get('sid')
+        if not sid:
+            return False
+        try:
+            sesion_ref = self._sesion_ref(sid)
+            sesion = sesion_ref.get()
+            if not sesion.exists:
+                return False
+            tokens = self.pyrebase_auth.refresh(sesion.get('refresh_token'))
+            sesion_ref.update({'refresh_token': tokens['refreshToken']})
+        except Exception as e:
+            logger.warning("Error al refrescar el token: %s", e)
+            return False
+        session['idToken'] = tokens['idToken']
+        session['tokenExp'] = None
+        return True
+
+    def cerrar(self, session):
+        """Borra el refresh token guardado de la sesión y la vacía."""
+        sid = session.get('sid')
+        if sid:
+            try:
+                self._sesion_ref(sid).delete()
+            except Exception as e:
+                logger.warning("Error al borrar la sesión: %s", e)
+        session.clear()
+
+    def validar(self, session):
+        """Comprueba la sesión actual, renovando el token si está por vencer.
+
+        Devuelve True si la sesión sigue siendo válida; actualiza en ella el
+        perfil del empleado por si cambió (por ejemplo, `is_admin`).
+        """
+        if 'idToken' not in session:
+            return False
+        # Cookies anteriores que todavía traen el refresh token.
+        session.pop('refreshToken', None)
+
+        exp = session.get('tokenExp')
+        if exp is None or exp - time.time() < self.margen_refresco:
+            self._refrescar(session)
+
+        try:
+            claims = self.verificar(session['idToken'])
+        except (auth.InvalidIdTokenError, auth.CertificateFetchError, ValueError) as e:
+            logger.info("Token de sesión inválido: %s", e)
+            return False
+        if session.get('tokenExp') != claims['exp']:
+            session['tokenExp'] = claims['exp']
+
+        perfil = self.perfil(claims['uid'], claims.get('email'))
+        if perfil is None:
+            return False
+        if session.get('is_admin') != perfil['is_admin']:
+            session['is_admin'] = perfil['is_admin']
+        if session.get('nombreEmpleado') != perfil['nombre']:
+            session['nombreEmpleado'] = perfil['nombre']
+        return True
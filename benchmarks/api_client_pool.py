@@ -0,0 +1,92 @@
+"""Compara la latencia por llamada de APIClient con y sin pool de conexiones.
+
+Levanta un servidor HTTP local que responde JSON con keep-alive y mide
+`requests.get` (una conexión nueva por llamada) frente a `APIClient.get`
+(sesión compartida). Uso:
+
+    python benchmarks/api_client_pool.py [iteraciones] [retardo_ms]
+
+El retardo simula el tiempo de ida y vuelta al backend en cada conexión
+nueva, que es lo que el pool evita pagar en cada llamada.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import APIClient  # noqa: E402
+
+
+RETARDO_CONEXION = 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Penaliza solo el establecimiento de la conexión, como un handshake TCP+TLS.
+        time.sleep(RETARDO_CONEXION)
+        super().setup()
+
+    def do_GET(self):
+        body = json.dumps({"data": [{"id": "1"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchClient(APIClient):
+    """APIClient sin sesión de Flask; se crea sin caché para medir solo las conexiones."""
+
+    def _get_headers(self):
+        return {"Authorization": "Bearer bench", "Content-Type": "application/json"}
+
+    def _cache_key(self, endpoint, params):
+        return ("bench", endpoint, tuple(sorted((params or {}).items())))
+
+
+def medir(fn, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        fn()
+    return (time.perf_counter() - inicio) / iteraciones * 1000
+
+
+def main():
+    global RETARDO_CONEXION
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    RETARDO_CONEXION = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = BenchClient(base_url=base_url, cache_ttls={})
+    headers = client._get_headers()
+
+    sin_pool = medir(lambda: requests.get(f"{base_url}/empleados/getEmpleados", headers=headers).json(), iteraciones)
+    con_pool = medir(lambda: client.get("empleados/getEmpleados"), iteraciones)
+
+    print(f"iteraciones: {iteraciones}, retardo de conexión: {RETARDO_CONEXION * 1000:.0f} ms")
+    print(f"requests.get (sin pool): {sin_pool:.2f} ms/llamada")
+    print(f"APIClient.get (pool):    {con_pool:.2f} ms/llamada")
+    print(f"mejora: {sin_pool / con_pool:.1f}x")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Mide el ahorro de `select([...])` en lecturas de consulta como la lista de productos.
+
+Genera una colección simulada de productos con descripciones largas, la
+codifica como los `Document` protobuf que devuelve Firestore (completos y
+con máscara de campos) y compara bytes transferidos y tiempo de
+deserialización. Uso:
+
+    python benchmarks/firestore_projection.py [documentos] [longitud_descripcion]
+"""
+import random
+import string
+import sys
+import time
+from datetime import datetime, timezone
+
+from google.cloud.firestore_v1 import _helpers
+from google.cloud.firestore_v1.types import Document
+
+
+def generar_productos(cantidad, longitud_descripcion):
+    random.seed(42)
+    for i in range(cantidad):
+        texto = ''.join(random.choices(string.ascii_letters + ' ', k=longitud_descripcion))
+        yield f"producto{i}", {
+            'titulo': f"Producto {i}",
+            'descripcion': texto,
+            'tiny_descripcion': texto[:80],
+            'precio': round(random.uniform(10, 500), 2),
+            'imagen': f"https://storage.googleapis.com/arfind.appspot.com/productos/{i}.png",
+            'fecha_creacion': datetime.now(timezone.utc),
+        }
+
+
+def serializar(productos, campos=None):
+    """Documentos tal como llegarían por la red, opcionalmente con máscara."""
+    mensajes = []
+    for doc_id, datos in productos:
+        if campos is not None:
+            datos = {campo: datos[campo] for campo in campos if campo in datos}
+        documento = Document(
+            name=f"projects/p/databases/(default)/documents/productos/{doc_id}",
+            fields=_helpers.encode_dict(datos),
+        )
+        mensajes.append(Document.serialize(documento))
+    return mensajes
+
+
+def deserializar(mensajes):
+    inicio = time.perf_counter()
+    for mensaje in mensajes:
+        documento = Document.deserialize(mensaje)
+        _helpers.decode_dict(documento.fields, None)
+    return time.perf_counter() - inicio
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    longitud = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    productos = list(generar_productos(cantidad, longitud))
+
+    completos = serializar(productos)
+    proyectados = serializar(productos, campos=['titulo'])
+
+    bytes_completos = sum(len(m) for m in completos)
+    bytes_proyectados = sum(len(m) for m in proyectados)
+    tiempo_completos = deserializar(completos)
+    tiempo_proyectados = deserializar(proyectados)
+
+    print(f"documentos: {cantidad}, longitud de descripción: {longitud}")
+    print(f"sin select:         {bytes_completos / 1024:10.1f} KiB  {tiempo_completos * 1000:8.1f} ms")
+    print(f"select(['titulo']): {bytes_proyectados / 1024:10.1f} KiB  {tiempo_proyectados * 1000:8.1f} ms")
+    print(f"ahorro: {100 * (1 - bytes_proyectados / bytes_completos):.1f}% bytes, "
+          f"{100 * (1 - tiempo_proyectados / tiempo_completos):.1f}% tiempo")
+
+
+if __name__ == "__main__":
+    main()
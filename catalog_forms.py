@@ -0,0 +1,41 @@
+def validar_producto(campos):
+    """Datos de un producto a partir de un formulario o fila; ValueError si no es válido."""
+    titulo = campos.get('titulo')
+    descripcion = campos.get('descripcion')
+    precio = campos.get('precio')
+    if not (titulo and descripcion and precio):
+        raise ValueError("Todos los campos obligatorios deben completarse.")
+    try:
+        precio = float(precio)
+    except (TypeError, ValueError):
+        raise ValueError("El precio debe ser numérico.") from None
+    return {
+        'titulo': titulo,
+        'descripcion': descripcion,
+        'precio': precio,
+        'tiny_descripcion': campos.get('tinyDescripcion') or campos.get('tiny_descripcion'),
+    }
+
+
+def validar_plan(campos):
+    """Datos de un plan a partir de un formulario o fila; ValueError si no es válido."""
+    nombre = campos.get('nombre')
+    descripcion = campos.get('descripcion')
+    try:
+        precio = float(campos.get('precio'))
+        refresco = int(campos.get('refresco'))
+        cantidad_compartidos = int(campos.get('cantidad_compartidos'))
+    except (TypeError, ValueError):
+        raise ValueError("Precio, refresco y cantidad compartidos deben ser numéricos.") from None
+    if not all([nombre, precio, descripcion, refresco, cantidad_compartidos]):
+        raise ValueError("Todos los campos son obligatorios.")
+    return {
+        'nombre': nombre,
+        'precio': precio,
+        'descripcion': descripcion,
+        'refresco': refresco,
+        'cantidad_compartidos': cantidad_compartidos,
+    }
+
+
+VALIDADORES = {'productos': validar_producto, 'planes': validar_plan}
@@ -0,0 +1,353 @@
+"""Importación masiva de productos y planes desde CSV o NDJSON.
+
+Uso desde la línea de comandos:
+
+    python catalog_import.py planes planes.csv --imagenes ./fotos
+
+El archivo se lee fila por fila, las filas válidas se escriben en lotes de
+Firestore y las imágenes (URL http(s) de HOSTS_IMAGENES o, desde la CLI, rutas dentro de
+--imagenes) se procesan en un pool de hilos acotado.
+"""
+import argparse
+import csv
+import io
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+
+from catalog_forms import VALIDADORES
+import firestore_batch
+import image_pipeline
+
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('csv', 'ndjson')
+# Errores por fila que se guardan como detalle; el resto solo se cuenta.
+MAX_ERRORES = 1000
+# Cada cuántas filas se avisa el progreso.
+INTERVALO_PROGRESO = 1000
+# Timeouts (conexión, lectura) al descargar imágenes por URL.
+TIMEOUT_DESCARGA = (5, 30)
+# Hosts (y sus subdominios) desde los que se pueden descargar imágenes por URL.
+HOSTS_IMAGENES = ('storage.googleapis.com', 'firebasestorage.googleapis.com')
+# Contador de estadisticas/contadores que mantiene cada colección, si tiene.
+CONTADORES = {'planes': 'planes'}
+
+
+def detectar_formato(filename):
+    """'csv' o 'ndjson' según la extensión del archivo (None si no se reconoce)."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    return None
+
+
+def leer_filas(archivo, formato):
+    """Recorre un archivo binario fila por fila sin cargarlo entero.
+
+    Devuelve tuplas (numero_de_fila, fila) donde `fila` es un dict o, si la
+    línea no se pudo interpretar, la excepción correspondiente.
+    """
+    lineas = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        lector = csv.DictReader(lineas)
+        for numero, fila in enumerate(lector, start=2):
+            yield numero, {clave.strip(): (valor or '').strip() for clave, valor in fila.items() if clave}
+        return
+
+    for numero, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, ValueError(f"JSON inválido: {e}")
+            continue
+        if not isinstance(fila, dict):
+            yield numero, ValueError("Cada línea debe ser un objeto JSON.")
+            continue
+        yield numero, fila
+
+
+class Progreso:
+    """Estado de una importación; se puede leer desde otro hilo."""
+
+    def __init__(self, coleccion):
+        self.coleccion = coleccion
+        self.estado = 'procesando'
+        self.filas = 0
+        self.importadas = 0
+        self.fallidas = 0
+        self.imagenes_listas = 0
+        self.imagenes_fallidas = 0
+        self.errores = []
+        self.inicio = time.time()
+        self.fin = None
+        self._lock = threading.Lock()
+
+    def sumar(self, filas=0, importadas=0):
+        with self._lock:
+            self.filas += filas
+            self.importadas += importadas
+
+    def error(self, fila, mensaje):
+        with self._lock:
+            self.fallidas += 1
+            if len(self.errores) < MAX_ERRORES:
+                self.errores.append({'fila': fila, 'error': mensaje})
+
+    def imagen(self, fila, error=None):
+        with self._lock:
+            if error is None:
+                self.imagenes_listas += 1
+                return
+            self.imagenes_fallidas += 1
+            if len(self.errores) < MAX_ERRORES:
+                self.errores.append({'fila': fila, 'error': f"Imagen: {error}"})
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                'coleccion': self.coleccion,
+                'estado': self.estado,
+                'filas': self.filas,
+                'importadas': self.importadas,
+                'fallidas': self.fallidas,
+                'imagenes_listas': self.imagenes_listas,
+                'imagenes_fallidas': self.imagenes_fallidas,
+                'errores': list(self.errores),
+                'errores_omitidos': max(0, self.fallidas + self.imagenes_fallidas - len(self.errores)),
+                'segundos': round((self.fin or time.time()) - self.inicio, 3),
+            }
+
+
+class CatalogImporter:
+    """Importa filas validadas a `coleccion` ('productos' o 'planes').
+
+    Las filas válidas se escriben en lotes de hasta MAX_BATCH_SIZE con
+    `imagen_estado` 'pendiente'; una vez confirmado el lote, cada imagen se
+    procesa en un pool de `max_workers` hilos. Como mucho hay `max_pendientes`
+    imágenes en cola: al llegar al límite la lectura del archivo espera.
+    Las imágenes por URL solo se descargan de `hosts_imagenes` y nunca de
+    direcciones privadas, de loopback o link-local.
+    """
+
+    def __init__(self, db, bucket, coleccion, contadores=None, directorio_imagenes=None,
+                 max_workers=4, max_pendientes=16, hosts_imagenes=HOSTS_IMAGENES):
+        if coleccion not in VALIDADORES:
+            raise ValueError(f"Colección no importable: {coleccion}")
+        self.db = db
+        self.bucket = bucket
+        self.coleccion = coleccion
+        self.contadores = contadores
+        self.directorio_imagenes = os.path.realpath(directorio_imagenes) if directorio_imagenes else None
+        self.max_workers = max_workers
+        self.hosts_imagenes = tuple(host.lower() for host in hosts_imagenes)
+        self._huecos = threading.BoundedSemaphore(max_pendientes)
+        self._http = requests.Session()
+
+    def _validar_url(self, url):
+        """Lanza ValueError si `url` no apunta a un host permitido y público."""
+        host = (url.hostname or '').lower()
+        if not any(host == permitido or host.endswith('.' + permitido) for permitido in self.hosts_imagenes):
+            raise ValueError(f"Host de imagen no permitido: {host or url.netloc}")
+        try:
+            direcciones = {info[4][0] for info in socket.getaddrinfo(host, url.port or None)}
+        except socket.gaierror as e:
+            raise ValueError(f"No se pudo resolver {host}: {e}") from None
+        for direccion in direcciones:
+            if not ipaddress.ip_address(direccion.split('%', 1)[0]).is_global:
+                raise ValueError(f"{host} resuelve a una dirección no pública ({direccion}).")
+
+    def _abrir_imagen(self, origen):
+        """Devuelve (archivo_temporal, filename) para una URL o ruta local permitida."""
+        url = urlparse(origen)
+        if url.scheme in ('http', 'https'):
+            self._validar_url(url)
+            # Sin redirecciones: podrían llevar a un host que no pasó la validación.
+            with self._http.get(origen, stream=True, timeout=TIMEOUT_DESCARGA,
+                                allow_redirects=False) as respuesta:
+                if respuesta.is_redirect:
+                    raise ValueError("La URL de la imagen redirige a otra dirección.")
+                respuesta.raise_for_status()
+                respuesta.raw.decode_content = True
+                filename = os.path.basename(url.path) or 'imagen'
+                return image_pipeline.spool(respuesta.raw), filename
+
+        if self.directorio_imagenes is None:
+            raise ValueError("Solo se admiten imágenes por URL http(s).")
+        ruta = os.path.realpath(os.path.join(self.directorio_imagenes, origen))
+        if os.path.commonpath([ruta, self.directorio_imagenes]) != self.directorio_imagenes:
+            raise ValueError("La ruta de la imagen está fuera del directorio de imágenes.")
+        with open(ruta, 'rb') as archivo:
+            return image_pipeline.spool(archivo), os.path.basename(ruta)
+
+    def _subir_imagen(self, referencia, origen, fila, progreso):
+        try:
+            datos, filename = self._abrir_imagen(origen)
+            with datos:
+                campos = image_pipeline.ingestar(self.bucket, datos, self.coleccion, filename=filename)
+            referencia.update({**campos, 'imagen_estado': 'listo'})
+            progreso.imagen(fila)
+        except Exception as e:
+            logger.warning("Error con la imagen de la fila %s (%s): %s", fila, origen, e)
+            progreso.imagen(fila, str(e))
+            try:
+                referencia.update({'imagen_estado': 'error'})
+            except Exception as error:
+                logger.error("Error al marcar la imagen de la fila %s: %s", fila, error)
+        finally:
+            self._huecos.release()
+
+    def _confirmar(self, pendientes, progreso, executor):
+        operaciones = [(fila, 'set', referencia, datos) for fila, referencia, datos, _ in pendientes]
+        resultados = firestore_batch.escribir_en_lote(self.db, operaciones)
+        confirmadas = 0
+        for fila, referencia, _, imagen in pendientes:
+            if resultados[fila] is not None:
+                progreso.error(fila, resultados[fila])
+                continue
+            confirmadas += 1
+            self._huecos.acquire()
+            try:
+                executor.submit(self._subir_imagen, referencia, imagen, fila, progreso)
+            except Exception:
+                self._huecos.release()
+                raise
+        progreso.sumar(importadas=confirmadas)
+        clave = CONTADORES.get(self.coleccion)
+        if clave and self.contadores is not None:
+            self.contadores.incrementar(clave, confirmadas)
+
+    def importar(self, filas, progreso=None, al_progresar=None):
+        """Importa `filas` (como las de `leer_filas`) y devuelve el Progreso final."""
+        progreso = progreso or Progreso(self.coleccion)
+        validar = VALIDADORES[self.coleccion]
+        coleccion = self.db.collection(self.coleccion)
+        pendientes = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix=f"import-{self.coleccion}") as executor:
+            try:
+                for numero, fila in filas:
+                    progreso.sumar(filas=1)
+                    try:
+                        if isinstance(fila, Exception):
+                            raise fila
+                        imagen = fila.get('imagen') or ''
+                        if not isinstance(imagen, str):
+                            raise ValueError("La imagen debe ser una URL o ruta de texto.")
+                        imagen = imagen.strip()
+                        if not imagen:
+                            raise ValueError("Todos los campos son obligatorios (falta la imagen).")
+                        datos = {
+                            **validar(fila),
+                            'imagen_estado': 'pendiente',
+                            'fecha_creacion': datetime.utcnow(),
+                        }
+                    except (ValueError, TypeError, AttributeError) as e:
+                        # Un valor de tipo inesperado en una fila NDJSON invalida solo esa fila.
+                        progreso.error(numero, str(e))
+                    else:
+                        pendientes.append((numero, coleccion.document(), datos, imagen))
+
+                    if len(pendientes) >= firestore_batch.MAX_BATCH_SIZE:
+                        self._confirmar(pendientes, progreso, executor)
+                        pendientes = []
+                    if al_progresar and progreso.filas % INTERVALO_PROGRESO == 0:
+                        al_progresar(progreso)
+
+                self._confirmar(pendientes, progreso, executor)
+            except Exception as e:
+                logger.exception("Importación de %s interrumpida: %s", self.coleccion, e)
+                progreso.error(None, f"Importación interrumpida: {e}")
+                progreso.estado = 'error'
+
+        if progreso.estado != 'error':
+            progreso.estado = 'listo'
+        progreso.fin = time.time()
+        if al_progresar:
+            al_progresar(progreso)
+        return progreso
+
+
+class ImportJobs:
+    """Importaciones en segundo plano, consultables por ID."""
+
+    def __init__(self, max_jobs=50):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def iniciar(self, importador, archivo, formato):
+        """Importa `archivo` (binario, con seek; se cierra al terminar) en un hilo aparte."""
+        job_id = uuid.uuid4().hex
+        progreso = Progreso(importador.coleccion)
+        with self._lock:
+            self._jobs[job_id] = progreso
+            terminados = [clave for clave, job in self._jobs.items() if job.fin is not None]
+            for clave in terminados[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[clave]
+
+        def ejecutar():
+            with archivo:
+                importador.importar(leer_filas(archivo, formato), progreso=progreso)
+            logger.info("Importación %s de %s terminada: %s importadas, %s fallidas.",
+                        job_id, importador.coleccion, progreso.importadas, progreso.fallidas)
+
+        threading.Thread(target=ejecutar, name=f"import-{job_id[:8]}", daemon=True).start()
+        return job_id
+
+    def estado(self, job_id):
+        with self._lock:
+            progreso = self._jobs.get(job_id)
+        return progreso.como_dict() if progreso is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa productos o planes desde CSV o NDJSON.")
+    parser.add_argument('coleccion', choices=sorted(VALIDADORES))
+    parser.add_argument('archivo')
+    parser.add_argument('--formato', choices=FORMATOS)
+    parser.add_argument('--imagenes', help="Directorio base para las imágenes con ruta local.")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    formato = args.formato or detectar_formato(args.archivo)
+    if formato is None:
+        parser.error("No se reconoce el formato; use --formato.")
+
+    # Inicializa Firebase con la misma configuración que la app.
+    from main import bucket, contadores, db
+
+    importador = CatalogImporter(db, bucket, args.coleccion, contadores=contadores,
+                                 directorio_imagenes=args.imagenes, max_workers=args.workers)
+
+    def informar(progreso):
+        logger.info("%s filas leídas, %s importadas, %s con error.",
+                    progreso.filas, progreso.importadas, progreso.fallidas)
+
+    with open(args.archivo, 'rb') as archivo:
+        progreso = importador.importar(leer_filas(archivo, formato), al_progresar=informar)
+
+    resultado = progreso.como_dict()
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0 if resultado['estado'] == 'listo' and not resultado['fallidas'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+
+from firestore_queries import stream_fields
+import metrics
+from single_flight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogReplica:
+    """Copia en memoria de una colección pequeña de catálogo (planes, productos).
+
+    La primera instantánea de un listener `on_snapshot` carga la colección
+    completa y cada instantánea posterior la reemplaza, así las lecturas se
+    sirven desde memoria. Si el listener aún no cargó o se desconectó, las
+    lecturas van directo a Firestore y se intenta volver a registrar el
+    listener cada `reintento` segundos.
+    """
+
+    def __init__(self, db, coleccion, reintento=30):
+        self.db = db
+        self.coleccion = coleccion
+        self.reintento = reintento
+        self._documentos = {}
+        self._version = 0
+        self._read_time = None
+        self._actualizado = None
+        self._ultima_modificacion = None
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._watch = None
+        self._ultimo_intento = 0.0
+        self._vuelos = SingleFlight("catalogo")
+
+    def iniciar(self):
+        """Registra el listener sobre la colección."""
+        with self._lock:
+            if self._watch is not None and self._watch_activo():
+                return
+            self._ultimo_intento = time.monotonic()
+            if self._watch is not None:
+                self._cerrar_watch()
+            self._listo.clear()
+        try:
+            watch = self.db.collection(self.coleccion).on_snapshot(self._on_snapshot)
+        except Exception as e:
+            logger.error("Error al iniciar el listener de %s: %s", self.coleccion, e)
+            return
+        with self._lock:
+            self._watch = watch
+
+    def detener(self):
+        """Cancela el listener; las lecturas vuelven a ir a Firestore."""
+        with self._lock:
+            self._cerrar_watch()
+            self._listo.clear()
+
+    def _cerrar_watch(self):
+        if self._watch is None:
+            return
+        try:
+            self._watch.unsubscribe()
+        except Exception as e:
+            logger.warning("Error al cerrar el listener de %s: %s", self.coleccion, e)
+        self._watch = None
+
+    def _watch_activo(self):
+        # `is_active` es False cuando el stream del listener terminó por un error.
+        return getattr(self._watch, 'is_active', True)
+
+    def _on_snapshot(self, snapshot, cambios, read_time):
+        documentos = {doc.id: {'id': doc.id, **(doc.to_dict() or {})} for doc in snapshot}
+        ultima_modificacion = max((doc.update_time for doc in snapshot if doc.update_time), default=None)
+        with self._lock:
+            self._documentos = documentos
+            self._ultima_modificacion = ultima_modificacion
+            self._version += 1
+            self._read_time = read_time
+            self._actualizado = time.time()
+        self._listo.set()
+
+    @property
+    def activa(self):
+        """Indica si la copia está cargada y el listener sigue conectado."""
+        return self._listo.is_set() and self._watch is not None and self._watch_activo()
+
+    @property
+    def version(self):
+        """Número de instantáneas aplicadas; cambia con cada modificación de la colección."""
+        return self._version
+
+    def marca(self):
+        """(token, última modificación) de los datos actuales, o None si la copia no está activa.
+
+        El token (cantidad de documentos y mayor `update_time`) es el mismo en
+        todos los procesos que ven los mismos datos.
+        """
+        if not self.activa:
+            return None
+        with self._lock:
+            modificado = self._ultima_modificacion
+            token = (self.coleccion, len(self._documentos), modificado.isoformat() if modificado else None)
+        return token, modificado
+
+    def estado(self):
+        """Versión, antigüedad y conexión de la copia, para diagnóstico."""
+        with self._lock:
+            actualizado = self._actualizado
+            return {
+                'coleccion': self.coleccion,
+                'activa': self.activa,
+                'version': self._version,
+                'documentos': len(self._documentos),
+                'read_time': self._read_time.isoformat() if self._read_time else None,
+                'segundos_desde_actualizacion': (
+                    round(time.time() - actualizado, 3) if actualizado is not None else None
+                ),
+            }
+
+    def documentos(self, campos=None):
+        """Documentos de la colección como dicts {'id': ..., **datos}.
+
+        Con `campos` se devuelven solo esos campos (y la lectura directa usa
+        una máscara de campos). Cada llamada devuelve dicts nuevos, así el
+        llamador puede modificarlos sin tocar la copia compartida.
+        """
+        if not self.activa:
+            self._reconectar()
+            return self._leer_directo(campos)
+
+        with self._lock:
+            documentos = list(self._documentos.values())
+        if campos is None:
+            return [dict(documento) for documento in documentos]
+        return [
+            {'id': documento['id'], **{campo: documento.get(campo) for campo in campos}}
+            for documento in documentos
+        ]
+
+    def _leer_directo(self, campos):
+        clave = tuple(campos) if campos is not None else None
+        return self._vuelos.do(clave, lambda: self._stream_directo(campos))
+
+    def _stream_directo(self, campos):
+        metrics.catalog_direct_reads.inc(self.coleccion)
+        coleccion = self.db.collection(self.coleccion)
+        if campos is not None:
+            return list(stream_fields(coleccion, campos))
+        return [{'id': doc.id, **doc.to_dict()} for doc in coleccion.stream()]
+
+    def _reconectar(self):
+        if self._watch is not None and self._watch_activo():
+            # Registrado pero todavía sin la primera instantánea.
+            return
+        if time.monotonic() - self._ultimo_intento < self.reintento:
+            return
+        if self._watch is not None:
+            logger.warning("Listener de %s desconectado; se vuelve a registrar.", self.coleccion)
+        self.iniciar()
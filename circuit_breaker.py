@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+CERRADO = 'cerrado'
+SEMIABIERTO = 'semiabierto'
+ABIERTO = 'abierto'
+# Valor del gauge de métricas para cada estado.
+VALORES_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+
+class CircuitBreaker:
+    """Corta las llamadas a un backend que viene fallando.
+
+    Tras `umbral_fallos` fallos seguidos el circuito se abre y `permitir()`
+    devuelve False durante `espera` segundos. Pasado ese tiempo queda
+    semiabierto: se deja pasar una única llamada de prueba, que lo cierra si
+    funciona o lo vuelve a abrir si falla.
+    """
+
+    def __init__(self, nombre, umbral_fallos=5, espera=30):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.espera = espera
+        self._estado = CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+        metrics.api_circuit_state.set(nombre, valor=VALORES_ESTADO[CERRADO])
+
+    def _cambiar(self, estado):
+        if estado != self._estado:
+            logger.warning("Circuito de %s: %s -> %s", self.nombre, self._estado, estado)
+            self._estado = estado
+            metrics.api_circuit_state.set(self.nombre, valor=VALORES_ESTADO[estado])
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self._estado == ABIERTO and time.monotonic() - self._abierto_desde >= self.espera:
+                return SEMIABIERTO
+            return self._estado
+
+    def permitir(self):
+        """Indica si se puede intentar una llamada ahora."""
+        with self._lock:
+            if self._estado == CERRADO:
+                return True
+            if self._estado == ABIERTO:
+                if time.monotonic() - self._abierto_desde < self.espera:
+                    metrics.api_circuit_rejections.inc(self.nombre)
+                    return False
+                self._cambiar(SEMIABIERTO)
+            if self._prueba_en_curso:
+                metrics.api_circuit_rejections.inc(self.nombre)
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._prueba_en_curso = False
+            self._cambiar(CERRADO)
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self._estado == SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                self._abierto_desde = time.monotonic()
+                self._cambiar(ABIERTO)
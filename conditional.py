@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+from flask import Response, make_response, request, session
+
+
+def _version_plantillas():
+    """Marca de las plantillas desplegadas, para que un cambio de HTML cambie los ETag."""
+    carpeta = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+    try:
+        return max(
+            int(os.path.getmtime(os.path.join(carpeta, nombre)))
+            for nombre in os.listdir(carpeta)
+        )
+    except (OSError, ValueError):
+        return 0
+
+
+VERSION_PLANTILLAS = os.getenv('APP_VERSION') or str(_version_plantillas())
+
+
+def etag(token):
+    """ETag de una vista para la versión de datos `token` y el usuario en sesión.
+
+    Incluye lo que cambia el HTML además de los datos: las plantillas y los
+    datos de sesión que muestra el layout.
+    """
+    partes = (VERSION_PLANTILLAS, token, session.get('is_admin'), session.get('nombreEmpleado'))
+    return hashlib.sha256(repr(partes).encode()).hexdigest()[:32]
+
+
+def sin_cambios(version):
+    """Respuesta 304 si el cliente ya tiene `version` ((token, modificado) o None), si no None."""
+    if version is None:
+        return None
+    token, modificado = version
+    valor = etag(token)
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(valor):
+            return None
+    elif modificado is None or request.if_modified_since is None \
+            or modificado.replace(microsecond=0) > request.if_modified_since:
+        return None
+
+    respuesta = Response(status=304)
+    _validadores(respuesta, valor, modificado)
+    return respuesta
+
+
+def versionar(respuesta, version):
+    """Agrega ETag y Last-Modified de `version` a una respuesta 200."""
+    respuesta = make_response(respuesta)
+    if version is not None and respuesta.status_code == 200:
+        token, modificado = version
+        _validadores(respuesta, etag(token), modificado)
+    return respuesta
+
+
+def _validadores(respuesta, valor, modificado):
+    respuesta.set_etag(valor)
+    if modificado is not None:
+        respuesta.last_modified = modificado
+    # Las páginas dependen de la sesión: solo el navegador las guarda y siempre revalida.
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime
+
+from firebase_admin import firestore
+
+
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 10
+# Orden por ID de documento: a diferencia de un campo, no excluye documentos.
+CAMPO_ID = '__name__'
+
+
+def parse_request(args, columnas_ordenables, orden_por_defecto):
+    """Lee los parámetros del protocolo server-side de DataTables.
+
+    `columnas_ordenables` mapea el índice de columna de la tabla al campo de
+    Firestore por el que se puede ordenar; `orden_por_defecto` es la tupla
+    (campo, descendente) a usar si la petición no pide un orden válido.
+    """
+    try:
+        length = int(args.get('length', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        length = DEFAULT_PAGE_SIZE
+    if length <= 0 or length > MAX_PAGE_SIZE:
+        length = MAX_PAGE_SIZE
+
+    try:
+        start = max(int(args.get('start', 0)), 0)
+    except ValueError:
+        start = 0
+
+    campo, descendente = orden_por_defecto
+    try:
+        columna = int(args.get('order[0][column]', -1))
+    except ValueError:
+        columna = -1
+    if columna in columnas_ordenables:
+        campo = columnas_ordenables[columna]
+        descendente = args.get('order[0][dir]', 'asc') == 'desc'
+
+    return {
+        'draw': int(args.get('draw', 0) or 0),
+        'start': start,
+        'length': length,
+        'campo': campo,
+        'descendente': descendente,
+        'cursor': args.get('cursor') or None,
+    }
+
+
+def _encode_value(valor):
+    if isinstance(valor, datetime):
+        return {'ts': valor.isoformat()}
+    return valor
+
+
+def _decode_value(valor):
+    if isinstance(valor, dict) and 'ts' in valor:
+        return datetime.fromisoformat(valor['ts'])
+    return valor
+
+
+def encode_cursor(campo, snapshot):
+    """Cursor opaco con el valor de orden y el ID del último documento de la página."""
+    valor = None if campo == CAMPO_ID else _encode_value(snapshot.get(campo))
+    datos = {'v': valor, 'id': snapshot.id}
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+
+def decode_cursor(campo, token):
+    """Convierte un cursor de `encode_cursor` en los valores de `start_after`."""
+    datos = json.loads(base64.urlsafe_b64decode(token.encode()))
+    if campo == CAMPO_ID:
+        return {CAMPO_ID: datos['id']}
+    return {campo: _decode_value(datos['v']), CAMPO_ID: datos['id']}
+
+
+def keyset_page(query, campo, descendente, length, cursor=None, start=0):
+    """Lee una página de `query` ordenada por `campo` con cursores de keyset.
+
+    Con `cursor` solo se leen los documentos de la página; sin él (saltos
+    directos a una página) se recurre a `offset`, que sí recorre los
+    anteriores. Firestore deja fuera de la consulta los documentos que no
+    tienen `campo`; CAMPO_ID ordena por ID y los incluye a todos. Devuelve
+    (documentos, cursor_de_la_página_siguiente).
+    """
+    direccion = firestore.Query.DESCENDING if descendente else firestore.Query.ASCENDING
+    if campo != CAMPO_ID:
+        query = query.order_by(campo, direction=direccion)
+    query = query.order_by(CAMPO_ID, direction=direccion)
+
+    if cursor:
+        try:
+            query = query.start_after(decode_cursor(campo, cursor))
+        except (ValueError, KeyError, TypeError):
+            cursor = None
+    if not cursor and start:
+        query = query.offset(start)
+
+    documentos = list(query.limit(length).stream())
+    siguiente = encode_cursor(campo, documentos[-1]) if len(documentos) == length else None
+    return documentos, siguiente
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# Filas que se agrupan en cada bloque de la respuesta.
+FILAS_POR_BLOQUE = 200
+
+
+def formatear_fecha(valor):
+    """Texto 'YYYY-MM-DD HH:MM:SS' de un datetime, Timestamp de Firestore o
+    {'_seconds': ...} del backend; None si no hay fecha reconocible."""
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(valor, 'seconds'):
+        return datetime.fromtimestamp(valor.seconds).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, dict) and '_seconds' in valor:
+        return datetime.fromtimestamp(valor['_seconds']).strftime('%Y-%m-%d %H:%M:%S')
+    return None
+
+
+def segundos_epoch(valor):
+    """Instante de `valor` en segundos desde epoch (los datetime sin zona se toman como UTC)."""
+    if isinstance(valor, datetime):
+        if valor.tzinfo is None:
+            valor = valor.replace(tzinfo=timezone.utc)
+        return valor.timestamp()
+    if hasattr(valor, 'seconds'):
+        return valor.seconds
+    if isinstance(valor, dict) and '_seconds' in valor:
+        return valor['_seconds']
+    return None
+
+
+def parse_filtros(args):
+    """Lee `desde`, `hasta` (YYYY-MM-DD, ambos inclusive) y `entregado` (true/false).
+
+    Devuelve (desde, hasta, entregado) con `hasta` ya como límite exclusivo
+    (el día siguiente) y None en los filtros ausentes. Lanza ValueError si
+    algún valor no es válido.
+    """
+    desde = hasta = entregado = None
+    if args.get('desde'):
+        desde = datetime.strptime(args['desde'], '%Y-%m-%d')
+    if args.get('hasta'):
+        hasta = datetime.strptime(args['hasta'], '%Y-%m-%d') + timedelta(days=1)
+    if args.get('entregado'):
+        if args['entregado'] not in ('true', 'false'):
+            raise ValueError("`entregado` debe ser true o false.")
+        entregado = args['entregado'] == 'true'
+    if desde and hasta and desde >= hasta:
+        raise ValueError("`desde` debe ser anterior o igual a `hasta`.")
+    return desde, hasta, entregado
+
+
+def _bloques(filas, escribir):
+    buffer = io.StringIO()
+    pendientes = 0
+    for fila in filas:
+        escribir(buffer, fila)
+        pendientes += 1
+        if pendientes >= FILAS_POR_BLOQUE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if pendientes:
+        yield buffer.getvalue()
+
+
+def csv_stream(filas, columnas):
+    """Bloques de texto CSV (con encabezado) para las filas dict de `filas`."""
+    encabezado = io.StringIO()
+    csv.writer(encabezado).writerow(columnas)
+    yield encabezado.getvalue()
+
+    def escribir(buffer, fila):
+        csv.writer(buffer).writerow(['' if fila.get(columna) is None else fila.get(columna)
+                                     for columna in columnas])
+
+    yield from _bloques(filas, escribir)
+
+
+def ndjson_stream(filas, columnas):
+    """Bloques NDJSON (un objeto por línea) para las filas dict de `filas`."""
+    def escribir(buffer, fila):
+        buffer.write(json.dumps({columna: fila.get(columna) for columna in columnas},
+                                ensure_ascii=False, default=str))
+        buffer.write('\n')
+
+    yield from _bloques(filas, escribir)
+
+
+STREAMS = {'csv': csv_stream, 'ndjson': ndjson_stream}
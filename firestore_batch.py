@@ -0,0 +1,39 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Límite de escrituras por commit de un WriteBatch de Firestore.
+MAX_BATCH_SIZE = 500
+
+
+def trozos(items, tamano=MAX_BATCH_SIZE):
+    """Parte `items` en listas de hasta `tamano` elementos."""
+    items = list(items)
+    for inicio in range(0, len(items), tamano):
+        yield items[inicio:inicio + tamano]
+
+
+def escribir_en_lote(db, operaciones):
+    """Aplica `operaciones` en un único WriteBatch.
+
+    Cada operación es una tupla (clave, metodo, referencia, datos) con
+    `metodo` 'set', 'update', 'create' o 'delete' (`datos` se ignora en
+    'delete'). El commit es atómico: devuelve {clave: None} si se aplicó o
+    {clave: mensaje_de_error} para todas si falló. El llamador debe
+    respetar MAX_BATCH_SIZE.
+    """
+    if not operaciones:
+        return {}
+    lote = db.batch()
+    for _, metodo, referencia, datos in operaciones:
+        if metodo == 'delete':
+            lote.delete(referencia)
+        else:
+            getattr(lote, metodo)(referencia, datos)
+    try:
+        lote.commit()
+    except Exception as e:
+        logger.error("Error al confirmar un lote de %s escrituras: %s", len(operaciones), e)
+        return {clave: str(e) for clave, _, _, _ in operaciones}
+    return {clave: None for clave, _, _, _ in operaciones}
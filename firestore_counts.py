@@ -0,0 +1,138 @@
+import logging
+from functools import partial
+
+from firebase_admin import firestore
+from google.api_core.exceptions import Conflict
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+COLECCION_ESTADISTICAS = 'estadisticas'
+DOCUMENTO_CONTADORES = 'contadores'
+
+
+class FirestoreCounter:
+    """Conteos de colecciones sin descargar sus documentos.
+
+    Usa consultas de agregación (count) de Firestore y, si no están
+    disponibles, recurre al documento de contadores mantenido por la app.
+    Con un `cargador` (ParallelLoader) las agregaciones se lanzan en paralelo.
+    """
+
+    def __init__(self, db, cargador=None):
+        self.db = db
+        self.cargador = cargador
+        self._vuelos = SingleFlight("conteos")
+        self.contadores_ref = db.collection(COLECCION_ESTADISTICAS).document(DOCUMENTO_CONTADORES)
+
+    def _leer_contadores(self):
+        """Lee el documento de contadores (una sola lectura)."""
+        try:
+            snapshot = self.contadores_ref.get()
+            if not snapshot.exists:
+                return {}
+            return snapshot.to_dict() or {}
+        except Exception as e:
+            logger.error("Error al leer el documento de contadores: %s", e)
+            return {}
+
+    def _agregar(self, query):
+        """Ejecuta una consulta de agregación count y devuelve el total."""
+        resultado = query.count(alias='total').get()
+        return int(resultado[0][0].value)
+
+    def contar(self, consultas):
+        """Cuenta cada consulta de `consultas` ({clave: query}).
+
+        Las claves identifican la consulta (igual que en el documento de
+        contadores): los conteos concurrentes de una misma clave comparten
+        una sola agregación. Las que no se puedan agregar se resuelven con el
+        documento de contadores, que se lee como máximo una vez por llamada.
+        """
+        cargadores = {
+            clave: partial(self._vuelos.do, clave, partial(self._agregar, query))
+            for clave, query in consultas.items()
+        }
+        if self.cargador is not None:
+            resultados = self.cargador.gather(**cargadores)
+            totales, errores = dict(resultados), resultados.errores
+        else:
+            totales, errores = {}, {}
+            for clave, cargar in cargadores.items():
+                try:
+                    totales[clave] = cargar()
+                except Exception as e:
+                    errores[clave] = e
+
+        contadores = None
+        for clave, error in errores.items():
+            logger.warning("Error en la agregación count de %s: %s", clave, error)
+            if contadores is None:
+                contadores = self._leer_contadores()
+            totales[clave] = int(contadores.get(clave, 0))
+        return {clave: totales[clave] for clave in consultas}
+
+    def incrementar(self, clave, cantidad=1):
+        """Ajusta un contador del documento de contadores de forma atómica."""
+        self.incrementar_varios({clave: cantidad})
+
+    def incrementar_varios(self, cambios):
+        """Ajusta varios contadores en una sola escritura."""
+        cambios = {clave: cantidad for clave, cantidad in cambios.items() if cantidad}
+        if not cambios:
+            return
+        try:
+            self.contadores_ref.set(
+                {clave: firestore.Increment(cantidad) for clave, cantidad in cambios.items()},
+                merge=True
+            )
+        except Exception as e:
+            logger.error("Error al actualizar contadores %s: %s", cambios, e)
+
+    def ajustar_pedido(self, anterior=None, nuevo=None):
+        """Refleja en los contadores el cambio de estado de un pedido.
+
+        `anterior` y `nuevo` son los datos del pedido antes y después de la
+        escritura (None si no existía o se eliminó).
+        """
+        self.ajustar_pedidos([(anterior, nuevo)])
+
+    def ajustar_pedidos(self, cambios_pedidos):
+        """Como `ajustar_pedido` para varios pares (anterior, nuevo), en una escritura."""
+        cambios = {'pedidos_entregados': 0, 'pedidos_no_entregados': 0}
+        for anterior, nuevo in cambios_pedidos:
+            if anterior is not None:
+                clave = 'pedidos_entregados' if anterior.get('is_entregado') else 'pedidos_no_entregados'
+                cambios[clave] -= 1
+            if nuevo is not None:
+                clave = 'pedidos_entregados' if nuevo.get('is_entregado') else 'pedidos_no_entregados'
+                cambios[clave] += 1
+        self.incrementar_varios(cambios)
+
+    def sembrar(self, consultas):
+        """Crea el documento de contadores con agregaciones si todavía no existe.
+
+        Sin él, los incrementos de la app empezarían desde 0 en una base con
+        datos. Devuelve True si lo creó (otro proceso puede ganarle la carrera).
+        """
+        if self.contadores_ref.get().exists:
+            return False
+        totales = {clave: self._agregar(query) for clave, query in consultas.items()}
+        try:
+            self.contadores_ref.create(totales)
+        except Conflict:
+            return False
+        logger.info("Documento de contadores creado: %s", totales)
+        return True
+
+    def recalcular(self, consultas):
+        """Reconstruye el documento de contadores a partir de agregaciones.
+
+        Útil tras cambios hechos fuera de la app (por ejemplo, cambios de
+        `is_admin` en el backend, que no se reflejan de forma incremental).
+        """
+        totales = {clave: self._agregar(query) for clave, query in consultas.items()}
+        self.contadores_ref.set(totales, merge=True)
+        return totales
@@ -0,0 +1,31 @@
+def stream_fields(query, campos):
+    """Recorre `query` trayendo solo `campos` (máscara de campos de Firestore).
+
+    Devuelve dicts {'id': ..., campo: valor}; los campos ausentes en un
+    documento quedan como None. Pensado para lecturas de consulta, como
+    listas desplegables, donde el resto del documento no se usa.
+    """
+    for doc in query.select(list(campos)).stream():
+        datos = doc.to_dict() or {}
+        yield {'id': doc.id, **{campo: datos.get(campo) for campo in campos}}
+
+
+def stream_in_pages(query, tamano=1000):
+    """Recorre `query` (ya ordenada) en páginas de `tamano` documentos.
+
+    Cada página es una consulta corta que arranca después del último
+    documento de la anterior, así una exportación larga no depende de un
+    único stream abierto durante minutos.
+    """
+    ultimo = None
+    while True:
+        pagina = query.limit(tamano)
+        if ultimo is not None:
+            pagina = pagina.start_after(ultimo)
+        cantidad = 0
+        for doc in pagina.stream():
+            cantidad += 1
+            ultimo = doc
+            yield doc
+        if cantidad < tamano:
+            return
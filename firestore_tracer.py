@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+
+from flask import current_app, g, has_app_context, request
+
+logger = logging.getLogger(__name__)
+
+
+# Lecturas de documentos a partir de las cuales se avisa que una petición es costosa.
+READ_BUDGET = int(os.getenv('FIRESTORE_READ_BUDGET', '500'))
+# Lecturas de documentos sueltos de una misma colección que sugieren un N+1.
+REPEATED_GET_THRESHOLD = int(os.getenv('FIRESTORE_REPEATED_GET_THRESHOLD', '5'))
+# Envía los encabezados X-Firestore-* también fuera del modo debug de Flask.
+DEBUG_HEADERS = os.getenv('FIRESTORE_DEBUG_HEADERS', '').lower() in ('1', 'true', 'yes')
+
+
+class RequestTrace:
+    """Lecturas, escrituras y consultas de Firestore hechas por una petición."""
+
+    __slots__ = ('lecturas', 'escrituras', 'consultas', 'por_coleccion', 'gets_sueltos', '_lock')
+
+    def __init__(self):
+        # Las lecturas de ParallelLoader registran desde otros hilos.
+        self._lock = threading.Lock()
+        self.lecturas = 0
+        self.escrituras = 0
+        self.consultas = 0
+        self.por_coleccion = {}
+        self.gets_sueltos = {}
+
+    def registrar(self, coleccion, tipo, lecturas=0, escrituras=0):
+        """Suma una operación; `tipo` es 'consulta', 'documento' o 'escritura'."""
+        with self._lock:
+            self.lecturas += lecturas
+            self.escrituras += escrituras
+            if tipo == 'consulta':
+                self.consultas += 1
+            elif tipo == 'documento':
+                self.gets_sueltos[coleccion] = self.gets_sueltos.get(coleccion, 0) + 1
+            if lecturas:
+                self.por_coleccion[coleccion] = self.por_coleccion.get(coleccion, 0) + lecturas
+
+    def advertencias(self, presupuesto=READ_BUDGET, umbral_gets=REPEATED_GET_THRESHOLD):
+        avisos = []
+        if self.lecturas > presupuesto:
+            detalle = ', '.join(f"{c}={n}" for c, n in sorted(self.por_coleccion.items()))
+            avisos.append(f"{self.lecturas} lecturas superan el presupuesto de {presupuesto} ({detalle})")
+        for coleccion, cantidad in self.gets_sueltos.items():
+            if cantidad >= umbral_gets:
+                avisos.append(
+                    f"{cantidad} lecturas de documentos sueltos en '{coleccion}'; "
+                    "considerar get_all o una consulta 'in'"
+                )
+        return avisos
+
+
+def iniciar():
+    g.firestore_trace = RequestTrace()
+
+
+def actual():
+    """Traza de la petición en curso o None (por ejemplo, en hilos de fondo)."""
+    if not has_app_context():
+        return None
+    return g.get('firestore_trace')
+
+
+def finalizar(response):
+    """Avisa si la petición es costosa y, en debug o con DEBUG_HEADERS, agrega los encabezados X-Firestore-*."""
+    traza = actual()
+    if traza is None:
+        return response
+
+    if DEBUG_HEADERS or current_app.debug:
+        response.headers['X-Firestore-Reads'] = str(traza.lecturas)
+        response.headers['X-Firestore-Writes'] = str(traza.escrituras)
+        response.headers['X-Firestore-Queries'] = str(traza.consultas)
+        if traza.por_coleccion:
+            response.headers['X-Firestore-Reads-By-Collection'] = ';'.join(
+                f"{coleccion}={cantidad}" for coleccion, cantidad in sorted(traza.por_coleccion.items())
+            )
+
+    for aviso in traza.advertencias():
+        logger.warning("Advertencia Firestore en %s %s: %s", request.method, request.path, aviso)
+    return response
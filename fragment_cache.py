@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session
+from markupsafe import Markup
+
+import metrics
+
+
+class FragmentCache:
+    """Caché LRU de fragmentos HTML ya renderizados (cuerpos de tablas).
+
+    La clave combina el nombre del fragmento, su generación, la versión de
+    los datos que pasa la vista y la variante `is_admin`. `invalidar(nombre)`
+    sube la generación, así los renders que ya estaban en curso con datos
+    viejos quedan guardados bajo una clave que nadie vuelve a pedir. La
+    memoria se acota por cantidad de entradas y por bytes totales.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generaciones = {}
+        self._lock = threading.Lock()
+
+    def _get(self, clave):
+        with self._lock:
+            entrada = self._entries.get(clave)
+            if entrada is None:
+                return None
+            self._entries.move_to_end(clave)
+            return entrada[0]
+
+    def _set(self, clave, html):
+        # Tamaño en bytes UTF-8: los textos en español tienen caracteres multibyte.
+        tamano = len(html.encode('utf-8'))
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entries.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entries[clave] = (html, tamano)
+            self._bytes += tamano
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, descartado) = self._entries.popitem(last=False)
+                self._bytes -= descartado
+
+    def invalidar(self, nombre):
+        """Descarta los fragmentos de `nombre` tras una escritura en sus datos."""
+        with self._lock:
+            self._generaciones[nombre] = self._generaciones.get(nombre, 0) + 1
+            for clave in [clave for clave in self._entries if clave[0] == nombre]:
+                self._bytes -= self._entries.pop(clave)[1]
+
+    def fragmento(self, nombre, version, caller):
+        """Global de Jinja para `{% call fragmento('nombre', version) %}...{% endcall %}`.
+
+        Sin `version` (por ejemplo, si los datos no vienen de una fuente
+        versionada) el bloque se renderiza siempre.
+        """
+        if not version:
+            return caller()
+        with self._lock:
+            generacion = self._generaciones.get(nombre, 0)
+        clave = (nombre, generacion, version, bool(session.get('is_admin')))
+
+        html = self._get(clave)
+        if html is not None:
+            metrics.fragment_cache_requests.inc(nombre, 'hit')
+            return Markup(html)
+        metrics.fragment_cache_requests.inc(nombre, 'miss')
+        html = str(caller())
+        self._set(clave, html)
+        return Markup(html)
+
+    def invalida(self, *nombres):
+        """Decorador para rutas de escritura: invalida `nombres` tras cada POST."""
+        def decorador(vista):
+            @wraps(vista)
+            def envuelta(*args, **kwargs):
+                try:
+                    return vista(*args, **kwargs)
+                finally:
+                    if request.method == 'POST':
+                        for nombre in nombres:
+                            self.invalidar(nombre)
+            return envuelta
+        return decorador
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
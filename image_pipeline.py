@@ -0,0 +1,253 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from PIL import Image, ImageOps, features
+
+import metrics
+
+
+# Lado mayor máximo (en píxeles) de cada variante que se genera.
+VARIANTES = {
+    'thumb': 100,
+    'medium': 480,
+    'full': 1600,
+}
+
+WEBP_DISPONIBLE = features.check('webp')
+
+# Cambiar al modificar VARIANTES o la codificación, para no reutilizar blobs viejos.
+PIPELINE_VERSION = 1
+
+# Los blobs se nombran por su contenido: la URL cambia si cambia la imagen.
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CONTENT_TYPES = {
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+}
+
+EXTENSIONES = {
+    'WEBP': '.webp',
+    'JPEG': '.jpg',
+    'PNG': '.png',
+}
+
+# Límites de lo que se acepta: tamaño del archivo y píxeles de la imagen decodificada.
+MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(25 * 1024 * 1024)))
+MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '50000000'))
+
+# Por encima de este tamaño los buffers intermedios pasan de memoria a disco.
+SPOOL_MAX_SIZE = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Orientación EXIF que no requiere rotar la imagen.
+ORIENTACION_NORMAL = 1
+
+
+class ImagenInvalida(ValueError):
+    """La imagen supera los límites configurados o no se puede leer."""
+
+
+def spool(archivo, max_bytes=MAX_BYTES):
+    """Copia un stream a un archivo temporal que solo pasa a disco si es grande.
+
+    Lanza ImagenInvalida si el contenido supera `max_bytes`.
+    """
+    destino = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    total = 0
+    for bloque in iter(lambda: archivo.read(CHUNK_SIZE), b''):
+        total += len(bloque)
+        if total > max_bytes:
+            destino.close()
+            raise ImagenInvalida(f"La imagen supera el máximo de {max_bytes} bytes.")
+        destino.write(bloque)
+    destino.seek(0)
+    return destino
+
+
+def formato_respaldo(filename):
+    """Formato clásico según la extensión original (.jpg/.jpeg -> JPEG, resto -> PNG)."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    return 'JPEG' if ext in ['.jpg', '.jpeg'] else 'PNG'
+
+
+def _codificar(image, formato):
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    if formato == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, format='JPEG', quality=85, optimize=True, progressive=True)
+    elif formato == 'WEBP':
+        image.save(buffer, format='WEBP', quality=80, method=4)
+    else:
+        image.save(buffer, format='PNG', optimize=True)
+    buffer.seek(0)
+    return buffer
+
+
+def _formatos(variante, respaldo):
+    """Formatos en que se codifica cada variante, en orden de subida."""
+    formatos = ['WEBP'] if WEBP_DISPONIBLE else []
+    if variante == 'full' or not WEBP_DISPONIBLE:
+        formatos.append(respaldo)
+    return formatos
+
+
+def _es_compatible(original, respaldo):
+    """Indica si el archivo ya sirve como variante completa sin recodificarlo."""
+    return (
+        original.format == respaldo
+        and max(original.size) <= VARIANTES['full']
+        and original.mode in ('RGB', 'RGBA', 'L')
+        and original.getexif().get(0x0112, ORIENTACION_NORMAL) == ORIENTACION_NORMAL
+    )
+
+
+def _derivado(variante, formato, datos):
+    return {
+        'variante': variante,
+        'formato': formato,
+        'content_type': CONTENT_TYPES[formato],
+        'extension': EXTENSIONES[formato],
+        'datos': datos,
+    }
+
+
+def procesar(archivo, filename):
+    """Decodifica la imagen una vez y genera sus variantes.
+
+    Aplica la orientación EXIF y limita cada variante a su lado máximo. Cada
+    variante se codifica en WebP (si Pillow lo soporta) y la variante `full`
+    también en el formato de respaldo (JPEG/PNG), que es el que se guarda en
+    el campo `imagen` para los clientes que no leen WebP.
+
+    Si el archivo ya es un JPEG/PNG del formato y tamaño esperados, se usa
+    tal cual como variante de respaldo. Los JPEG grandes se decodifican a
+    resolución reducida (`draft`), sin cargar todos sus píxeles.
+
+    Devuelve una lista de dicts con `variante`, `formato`, `content_type`,
+    `extension` y `datos` (archivo temporal).
+    """
+    respaldo = formato_respaldo(filename)
+    derivados = []
+    try:
+        original = Image.open(archivo)
+    except Exception as e:
+        raise ImagenInvalida(f"No se pudo leer la imagen: {e}") from e
+
+    with original:
+        ancho, alto = original.size
+        if ancho * alto > MAX_PIXELS:
+            raise ImagenInvalida(f"La imagen supera el máximo de {MAX_PIXELS} píxeles.")
+
+        formatos_full = _formatos('full', respaldo)
+        if _es_compatible(original, respaldo):
+            archivo.seek(0)
+            derivados.append(_derivado('full', respaldo, archivo))
+            formatos_full.remove(respaldo)
+
+        if original.format == 'JPEG':
+            lado = VARIANTES['full']
+            original.draft('RGB', (lado, lado))
+
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            tiene_alfa = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if tiene_alfa else 'RGB')
+
+        # De mayor a menor: cada variante se reduce a partir de la anterior.
+        for variante, lado in sorted(VARIANTES.items(), key=lambda item: -item[1]):
+            image.thumbnail((lado, lado), Image.LANCZOS)
+            formatos = formatos_full if variante == 'full' else _formatos(variante, respaldo)
+            for formato in formatos:
+                derivados.append(_derivado(variante, formato, _codificar(image, formato)))
+    return derivados
+
+
+def _nombre_blob(carpeta, nombre, variante, formato):
+    sufijo = '' if variante == 'full' else f"_{variante}"
+    return f"{carpeta}/{nombre}{sufijo}{EXTENSIONES[formato]}"
+
+
+def _es_marcador(variante, formato, respaldo):
+    """La variante completa en formato de respaldo se sube la última y marca el conjunto como completo."""
+    return variante == 'full' and formato == respaldo
+
+
+def _campos(bucket, carpeta, nombre, respaldo):
+    """Campos de imagen del documento para un conjunto de variantes ya subido.
+
+    `imagen` conserva la URL de la variante completa en formato de respaldo;
+    `imagenes` mapea cada variante a su URL preferida (WebP si existe).
+    """
+    campos = {'imagen': None, 'imagenes': {}}
+    for variante in VARIANTES:
+        for formato in _formatos(variante, respaldo):
+            url = bucket.blob(_nombre_blob(carpeta, nombre, variante, formato)).public_url
+            if _es_marcador(variante, formato, respaldo):
+                campos['imagen'] = url
+            if formato == 'WEBP' or variante not in campos['imagenes']:
+                campos['imagenes'][variante] = url
+    return campos
+
+
+def subir(bucket, derivados, carpeta, nombre, respaldo):
+    """Sube las variantes a Storage y devuelve los campos de imagen del documento.
+
+    Los nombres dependen del contenido, así que cada URL es inmutable y se
+    publica con caché de larga duración.
+    """
+    derivados = sorted(derivados, key=lambda d: _es_marcador(d['variante'], d['formato'], respaldo))
+    for derivado in derivados:
+        blob = bucket.blob(_nombre_blob(carpeta, nombre, derivado['variante'], derivado['formato']))
+        blob.cache_control = CACHE_CONTROL
+        datos = derivado['datos']
+        datos.seek(0, os.SEEK_END)
+        tamano = datos.tell()
+        datos.seek(0)
+        inicio = time.perf_counter()
+        blob.upload_from_file(datos, content_type=derivado['content_type'])
+        blob.make_public()
+        metrics.storage_upload_seconds.observe(time.perf_counter() - inicio, carpeta)
+        metrics.storage_upload_bytes.inc(carpeta, cantidad=tamano)
+    return _campos(bucket, carpeta, nombre, respaldo)
+
+
+def clave_contenido(archivo, respaldo, max_bytes=MAX_BYTES):
+    """Nombre base direccionado por contenido para los bytes de una imagen.
+
+    Lee el archivo por bloques (y lo deja al inicio). Incluye la versión del
+    pipeline y el formato de respaldo, de modo que cambiar las variantes o la
+    codificación produce nombres nuevos.
+    """
+    huella = hashlib.sha256()
+    huella.update(f"v{PIPELINE_VERSION}:{respaldo}:".encode())
+    total = 0
+    for bloque in iter(lambda: archivo.read(CHUNK_SIZE), b''):
+        total += len(bloque)
+        if total > max_bytes:
+            raise ImagenInvalida(f"La imagen supera el máximo de {max_bytes} bytes.")
+        huella.update(bloque)
+    archivo.seek(0)
+    return huella.hexdigest()
+
+
+def ingestar(bucket, archivo, carpeta, filename=None):
+    """Procesa y sube una imagen (FileStorage de Flask o archivo con `filename`).
+
+    `archivo` debe admitir `seek`. Si el mismo contenido ya se subió antes,
+    no se decodifica ni se vuelve a transferir: se devuelven directamente las
+    URLs existentes.
+    """
+    filename = filename or archivo.filename
+    respaldo = formato_respaldo(filename)
+    nombre = clave_contenido(archivo, respaldo)
+
+    marcador = bucket.blob(_nombre_blob(carpeta, nombre, 'full', respaldo))
+    if marcador.exists():
+        return _campos(bucket, carpeta, nombre, respaldo)
+
+    return subir(bucket, procesar(archivo, filename), carpeta, nombre, respaldo)
@@ -0,0 +1,176 @@
+import time
+
+from google.cloud.firestore_v1.base_aggregation import BaseAggregationQuery
+from google.cloud.firestore_v1.base_collection import BaseCollectionReference
+from google.cloud.firestore_v1.base_document import BaseDocumentReference
+from google.cloud.firestore_v1.base_query import BaseQuery
+
+import firestore_tracer
+import metrics
+
+
+_REFERENCIAS = (BaseQuery, BaseCollectionReference, BaseDocumentReference, BaseAggregationQuery)
+_ESCRITURAS = ('add', 'set', 'update', 'delete', 'create')
+
+
+def registrar(coleccion, operacion, inicio, tipo, lecturas=0, escrituras=0):
+    """Registra una operación de Firestore terminada (métricas y traza de la petición)."""
+    metrics.firestore_operation_seconds.observe(time.perf_counter() - inicio, coleccion, operacion)
+    if lecturas:
+        metrics.firestore_documents_read.inc(coleccion, cantidad=lecturas)
+    traza = firestore_tracer.actual()
+    if traza is not None:
+        traza.registrar(coleccion, tipo, lecturas=lecturas, escrituras=escrituras)
+
+
+class _Instrumentado:
+    """Envuelve una referencia o consulta de Firestore y mide sus operaciones.
+
+    Los métodos que construyen consultas (`where`, `order_by`, `document`...)
+    devuelven objetos también envueltos; el resto de atributos se delega tal
+    cual en el objeto original.
+    """
+
+    __slots__ = ('_objetivo', '_coleccion')
+
+    def __init__(self, objetivo, coleccion):
+        self._objetivo = objetivo
+        self._coleccion = coleccion
+
+    def _envolver(self, resultado):
+        if isinstance(resultado, _REFERENCIAS):
+            return _Instrumentado(resultado, self._coleccion)
+        return resultado
+
+    def _stream(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        lecturas = 0
+        try:
+            for documento in self._objetivo.stream(*args, **kwargs):
+                lecturas += 1
+                yield documento
+        finally:
+            registrar(self._coleccion, 'stream', inicio, 'consulta', lecturas=lecturas)
+
+    def _get(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = self._objetivo.get(*args, **kwargs)
+        if isinstance(self._objetivo, BaseAggregationQuery):
+            operacion, tipo, lecturas = 'aggregate', 'consulta', 1
+        elif isinstance(self._objetivo, BaseDocumentReference):
+            operacion, tipo, lecturas = 'get', 'documento', 1
+        else:
+            operacion, tipo, lecturas = 'get', 'consulta', len(resultado)
+        registrar(self._coleccion, operacion, inicio, tipo, lecturas=lecturas)
+        return resultado
+
+    def _escritura(self, operacion):
+        metodo = getattr(self._objetivo, operacion)
+
+        def ejecutar(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = metodo(*args, **kwargs)
+            registrar(self._coleccion, operacion, inicio, 'escritura', escrituras=1)
+            if operacion == 'add':
+                marca, referencia = resultado
+                return marca, self._envolver(referencia)
+            return resultado
+
+        return ejecutar
+
+    def __getattr__(self, nombre):
+        if nombre == 'stream':
+            return self._stream
+        if nombre == 'get':
+            return self._get
+        if nombre in _ESCRITURAS:
+            return self._escritura(nombre)
+
+        atributo = getattr(self._objetivo, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def delegar(*args, **kwargs):
+            return self._envolver(atributo(*args, **kwargs))
+
+        return delegar
+
+    def __repr__(self):
+        return f"<Instrumentado {self._objetivo!r}>"
+
+
+def _desenvolver(referencia):
+    if isinstance(referencia, _Instrumentado):
+        return referencia._objetivo
+    return referencia
+
+
+def _coleccion_de(referencia):
+    if isinstance(referencia, _Instrumentado):
+        return referencia._coleccion
+    return referencia.parent.id
+
+
+class _LoteInstrumentado:
+    """WriteBatch que acepta referencias envueltas y mide el commit."""
+
+    def __init__(self, lote):
+        self._lote = lote
+        self._escrituras = {}
+
+    def _agregar(self, operacion, referencia, *args, **kwargs):
+        coleccion = _coleccion_de(referencia)
+        self._escrituras[coleccion] = self._escrituras.get(coleccion, 0) + 1
+        getattr(self._lote, operacion)(_desenvolver(referencia), *args, **kwargs)
+        return self
+
+    def create(self, referencia, *args, **kwargs):
+        return self._agregar('create', referencia, *args, **kwargs)
+
+    def set(self, referencia, *args, **kwargs):
+        return self._agregar('set', referencia, *args, **kwargs)
+
+    def update(self, referencia, *args, **kwargs):
+        return self._agregar('update', referencia, *args, **kwargs)
+
+    def delete(self, referencia, *args, **kwargs):
+        return self._agregar('delete', referencia, *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = self._lote.commit(*args, **kwargs)
+        for coleccion, cantidad in self._escrituras.items():
+            registrar(coleccion, 'batch_commit', inicio, 'escritura', escrituras=cantidad)
+        return resultado
+
+    def __len__(self):
+        return sum(self._escrituras.values())
+
+
+class InstrumentedClient:
+    """Cliente de Firestore que mide las operaciones por colección."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, nombre):
+        return _Instrumentado(self._client.collection(nombre), nombre)
+
+    def batch(self):
+        return _LoteInstrumentado(self._client.batch())
+
+    def get_all(self, referencias, *args, **kwargs):
+        """Lee varios documentos en una sola llamada (acepta referencias envueltas)."""
+        referencias = list(referencias)
+        inicio = time.perf_counter()
+        documentos = list(self._client.get_all([_desenvolver(r) for r in referencias], *args, **kwargs))
+        lecturas = {}
+        for referencia in referencias:
+            coleccion = _coleccion_de(referencia)
+            lecturas[coleccion] = lecturas.get(coleccion, 0) + 1
+        for coleccion, cantidad in lecturas.items():
+            registrar(coleccion, 'get_all', inicio, 'consulta', lecturas=cantidad)
+        return documentos
+
+    def __getattr__(self, nombre):
+        return getattr(self._client, nombre)
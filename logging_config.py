@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+
+# Claves cuyo valor nunca se escribe en los logs.
+CLAVES_SENSIBLES = {'password', 'idtoken', 'refreshtoken', 'authorization', 'token', 'private_key'}
+# JWT (ID tokens de Firebase) que aparezcan sueltos en un mensaje.
+PATRON_JWT = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+')
+REDACTADO = '[REDACTADO]'
+
+
+def redactar(valor):
+    """Copia de `valor` sin secretos (claves sensibles y JWT)."""
+    if isinstance(valor, dict):
+        return {
+            clave: REDACTADO if str(clave).lower() in CLAVES_SENSIBLES else redactar(dato)
+            for clave, dato in valor.items()
+        }
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(redactar(dato) for dato in valor)
+    if isinstance(valor, str):
+        return PATRON_JWT.sub(REDACTADO, valor)
+    return valor
+
+
+class RedactionFilter(logging.Filter):
+    """Quita secretos de los argumentos antes de que se formatee el mensaje."""
+
+    def filter(self, record):
+        if record.args:
+            if isinstance(record.args, dict):
+                record.args = redactar(record.args)
+            else:
+                record.args = tuple(redactar(arg) for arg in record.args)
+        if isinstance(record.msg, str):
+            record.msg = PATRON_JWT.sub(REDACTADO, record.msg)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar solo una fracción de los mensajes DEBUG de alto volumen."""
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.tasa >= 1:
+            return True
+        return random.random() < self.tasa
+
+
+class RequestIdFilter(logging.Filter):
+    """Agrega a cada registro el ID de la petición en curso."""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro."""
+
+    def format(self, record):
+        entrada = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entrada['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entrada, ensure_ascii=False, default=str)
+
+
+def configurar_logging():
+    """Configura el logger raíz según LOG_LEVEL, LOG_FORMAT y LOG_DEBUG_SAMPLE_RATE."""
+    handler = logging.StreamHandler()
+    if os.getenv('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+        ))
+    handler.addFilter(SamplingFilter(float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1'))))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(RedactionFilter())
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [handler]
+    raiz.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+
+def asignar_request_id():
+    """Toma el X-Request-ID entrante o genera uno nuevo para la petición."""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    return g.request_id
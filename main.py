@@ -1,19 +1,47 @@
-from flask import Flask, jsonify, redirect, render_template, request, session, url_for
+from flask import (
+    Flask, Response, g, jsonify, redirect, render_template, request, session, stream_with_context, url_for
+)
 import firebase_admin
 from firebase_admin import credentials, firestore
 from dotenv import load_dotenv
 import os
 from functools import wraps
-from datetime import datetime
+import time
+import hmac
+import secrets
+from datetime import datetime, timezone
 from firebase_admin import storage
-from PIL import Image
-import io
+import logging
+import shutil
+import tempfile
 
 from auth_config import pyrebase_auth, config
 from api_client import APIClient
+from auth_session import AuthManager
+import catalog_forms
+import catalog_import
+import conditional
+from catalog_replica import CatalogReplica
+import datatables
+import exports
+import image_pipeline
+import firestore_batch
+from firestore_counts import FirestoreCounter
+from firestore_queries import stream_in_pages
+from fragment_cache import FragmentCache
+from instrumented_firestore import InstrumentedClient
+import firestore_tracer
+import logging_config
+import metrics
+from parallel_loader import ParallelLoader
+from pedidos_stats import PedidosStats
+from upload_queue import UploadQueue, UploadQueueFull
+from user_resolver import UserResolver
 
 
 load_dotenv()
+logging_config.configurar_logging()
+logger = logging.getLogger(__name__)
 
 
 if not firebase_admin._apps:
@@ -33,19 +61,95 @@ if not firebase_admin._apps:
         "storageBucket": "arfind.appspot.com"
     })
 
-db = firestore.client()
+db = InstrumentedClient(firestore.client())
 bucket = storage.bucket()
+cargador = ParallelLoader(
+    max_workers=int(os.getenv("LOADER_WORKERS", "16")),
+    timeout=float(os.getenv("LOADER_TIMEOUT", "10"))
+)
+contadores = FirestoreCounter(db, cargador=cargador)
+
+
+def consultas_contadores():
+    """Consultas de cada clave del documento de contadores."""
+    return {
+        'dispositivos': db.collection('dispositivos'),
+        'planes': db.collection('planes'),
+        'empleados': db.collection('empleados'),
+        'admins': db.collection('empleados').where('is_admin', '==', True),
+        'pedidos_entregados': db.collection('pedidos').where('is_entregado', '==', True),
+        'pedidos_no_entregados': db.collection('pedidos').where('is_entregado', '==', False),
+    }
+
+
+try:
+    contadores.sembrar(consultas_contadores())
+except Exception as e:
+    logger.error("No se pudo crear el documento de contadores: %s", e)
+auth_manager = AuthManager(db, pyrebase_auth)
+pedidos_stats = PedidosStats(db)
+pedidos_stats.iniciar()
+catalogo = {nombre: CatalogReplica(db, nombre) for nombre in ('planes', 'productos')}
+for replica in catalogo.values():
+    replica.iniciar()
+upload_queue = UploadQueue(
+    max_workers=int(os.getenv("UPLOAD_WORKERS", "2")),
+    max_pending=int(os.getenv("UPLOAD_MAX_PENDING", "16"))
+)
 
 
 def get_authorization_headers():
     id_token = session.get("idToken")
     return {"Authorization": f"Bearer {id_token}"} if id_token else {}
 
-api_client = APIClient(base_url="https://arfindfranco-t22ijacwda-uc.a.run.app")
+api_client = APIClient(
+    base_url="https://arfindfranco-t22ijacwda-uc.a.run.app",
+    pool_size=int(os.getenv("API_POOL_SIZE", "10"))
+)
+user_resolver = UserResolver(api_client, cargador)
+importaciones = catalog_import.ImportJobs()
 
 
 app = Flask(__name__)
-app.secret_key = 'arfind'
+app.secret_key = os.getenv("SECRET_KEY")
+if not app.secret_key:
+    # Sin clave configurada las sesiones no sobreviven a un reinicio ni se comparten entre workers.
+    logger.warning("SECRET_KEY no está configurada; se usa una clave aleatoria.")
+    app.secret_key = secrets.token_hex(32)
+fragmentos = FragmentCache(
+    max_entries=int(os.getenv("FRAGMENT_CACHE_ENTRIES", "64")),
+    max_bytes=int(os.getenv("FRAGMENT_CACHE_BYTES", str(32 * 1024 * 1024)))
+)
+app.jinja_env.globals['fragmento'] = fragmentos.fragmento
+
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    logging_config.asignar_request_id()
+    firestore_tracer.iniciar()
+
+
+@app.after_request
+def registrar_medicion(response):
+    inicio = g.get('inicio_peticion')
+    if inicio is not None:
+        ruta = request.url_rule.rule if request.url_rule else 'desconocida'
+        metrics.http_request_seconds.observe(
+            time.perf_counter() - inicio, ruta, request.method, str(response.status_code)
+        )
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return firestore_tracer.finalizar(response)
+
+
+@app.route('/metrics')
+def exponer_metricas():
+    # Sin METRICS_TOKEN configurado el endpoint queda cerrado.
+    token = os.getenv("METRICS_TOKEN")
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return "No autorizado", 401
+    return Response(metrics.REGISTRY.exponer(), mimetype='text/plain; version=0.0.4')
 
 
 
@@ -59,27 +163,14 @@ def handle_login():
         try:
             user = pyrebase_auth.sign_in_with_email_and_password(username, password)
             id_token = user['idToken']
-            print(f"ID Token generado: {id_token}")
-
-            empleados_ref = db.collection('empleados')
-            query = empleados_ref.where('email', '==', username).stream()
-
-            empleado_data = None
-            for doc in query:
-                empleado_data = doc.to_dict()
-                break
-
-            if empleado_data:
-                session['nombreEmpleado'] = empleado_data['nombre']
-                session['is_admin'] = empleado_data['is_admin']
-                session['idToken'] = id_token
 
+            if auth_manager.iniciar(session, user):
                 return jsonify({"message": "Inicio de sesión exitoso", "idToken": id_token}), 200
             else:
                 return jsonify({"message": "Empleado no encontrado en Firestore"}), 404
 
         except Exception as e:
-            print(f"Error durante el inicio de sesión: {str(e)}")
+            logger.warning("Error durante el inicio de sesión: %s", e)
             return jsonify({"message": "Error durante el inicio de sesión. Intente nuevamente."}), 401
 
     return render_template('login.html')
@@ -89,7 +180,8 @@ def handle_login():
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'idToken' not in session:
+        if not auth_manager.validar(session):
+            auth_manager.cerrar(session)
             return redirect(url_for('handle_login'))
 
         return f(*args, **kwargs)
@@ -100,7 +192,7 @@ def login_required(f):
 # LOGOUT
 @app.route('/logout')
 def logout():
-    session.clear()
+    auth_manager.cerrar(session)
     return redirect(url_for('handle_login'))
 
 
@@ -112,40 +204,42 @@ def dashboard():
         return redirect(url_for('dashboard2'))
 
     try:
-        dispositivos = db.collection('dispositivos').stream()
-        planes = db.collection('planes').stream()
-        empleados = db.collection('empleados').stream()
-        admins = db.collection('empleados').where('is_admin', '==', True).stream()
-        pedidos_entregados = db.collection('pedidos').where('is_entregado', '==', True).stream()
-        pedidos_no_entregados = db.collection('pedidos').where('is_entregado', '==', False).stream()
+        totales = contadores.contar(consultas_contadores())
 
         return render_template(
             'index.html',
-            total_dispositivos=len(list(dispositivos)),
-            total_planes=len(list(planes)),
-            total_empleados=len(list(empleados)),
-            total_admins=len(list(admins)),
-            pedidos_entregados=len(list(pedidos_entregados)),
-            pedidos_no_entregados=len(list(pedidos_no_entregados)),
+            total_dispositivos=totales['dispositivos'],
+            total_planes=totales['planes'],
+            total_empleados=totales['empleados'],
+            total_admins=totales['admins'],
+            pedidos_entregados=totales['pedidos_entregados'],
+            pedidos_no_entregados=totales['pedidos_no_entregados'],
             is_admin=True
         )
     except Exception as e:
-        print(f"Error cargando dashboard admin: {e}")
+        logger.exception("Error cargando dashboard admin: %s", e)
         return "Error cargando dashboard admin", 500
 
 
+@app.route('/estadisticas/recalcular', methods=['POST'])
+@login_required
+def recalcular_contadores():
+    """Reconstruye el documento de contadores (p. ej. tras cambios hechos fuera de la app)."""
+    if not session.get('is_admin'):
+        return jsonify({"message": "No autorizado"}), 403
+    try:
+        return jsonify(contadores.recalcular(consultas_contadores()))
+    except Exception as e:
+        logger.exception("Error al recalcular contadores: %s", e)
+        return jsonify({"message": "Error al recalcular los contadores"}), 500
+
+
 # DASHBOARD para No Administradores
 @app.route('/dashboard2')
 @login_required
 def dashboard2():
     try:
-        db = firestore.client()
-        pedidos_ref = db.collection('pedidos').stream()
-        pedidos = [pedido.to_dict() for pedido in pedidos_ref]
-
-        pedidos_totales = len(pedidos)
-        pedidos_entregados = len([p for p in pedidos if p.get('is_entregado')])
-        pedidos_no_entregados = len([p for p in pedidos if not p.get('is_entregado')])
+        pedidos_totales, pedidos_entregados, pedidos_no_entregados = _resumen_pedidos()
 
         return render_template(
             'index.html',
@@ -155,7 +249,7 @@ def dashboard2():
             is_admin=False
         )
     except Exception as e:
-        print(f"Error al cargar el Dashboard de empleados: {e}")
+        logger.exception("Error al cargar el Dashboard de empleados: %s", e)
         return render_template(
             'index.html',
             pedidos_totales=0,
@@ -169,20 +263,29 @@ def dashboard2():
 @login_required
 def empleados():
     try:
+        no_modificado = conditional.sin_cambios(api_client.marca("empleados/getEmpleados"))
+        if no_modificado:
+            return no_modificado
+
         response = api_client.get("empleados/getEmpleados")
 
         if response:
             empleados = response.get("data", [])
-            return render_template('tb-empleados.html', empleados=empleados)
+            version = api_client.marca("empleados/getEmpleados")
+            return conditional.versionar(
+                render_template('tb-empleados.html', empleados=empleados, version_datos=version and version[0]),
+                version
+            )
         else:
             return jsonify({"message": "Error al obtener empleados"}), 500
     except Exception as e:
-        print(f"Error inesperado en empleados: {e}")
+        logger.exception("Error inesperado en empleados: %s", e)
         return jsonify({"message": "Error interno del servidor"}), 500
 
 # RUTA PARA AGREGAR EMPLEADO
 @app.route('/empleados/agregar', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('empleados')
 def agregar_empleado():
     error_message = None
     if request.method == 'POST':
@@ -191,7 +294,7 @@ def agregar_empleado():
         password = request.form.get('password')
         is_admin = request.form.get('is_admin')
 
-        print(f"Datos recibidos: Nombre={nombre}, Email={email}, Password={password}, is_admin={is_admin}")
+        logger.debug("Datos recibidos: nombre=%s, email=%s, is_admin=%s", nombre, email, is_admin)
 
         if not nombre or not email or not password or not is_admin:
             error_message = "Todos los campos son obligatorios."
@@ -209,15 +312,16 @@ def agregar_empleado():
                 'password': password,
                 'is_admin': is_admin
             }
-            print(f"Payload enviado a la API: {payload}")
+            logger.debug("Payload enviado a la API: %s", payload)
 
             response = api_client.post('empleados/createEmpleado', json=payload)
             if response:
+                contadores.incrementar_varios({'empleados': 1, 'admins': 1 if is_admin else 0})
                 return redirect(url_for('empleados'))
             else:
                 error_message = "Error al agregar el empleado."
         except Exception as e:
-            print(f"Error al agregar empleado: {e}")
+            logger.exception("Error al agregar empleado: %s", e)
             error_message = "Ocurrió un error al procesar la solicitud."
 
     return render_template('agregar-empleado.html', error_message=error_message)
@@ -226,6 +330,7 @@ def agregar_empleado():
 # RUTA PARA MODIFICAR EMPLEADO
 @app.route('/empleados/editar/<string:id_empleado>', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('empleados')
 def modificar_empleado(id_empleado):
     error_message = None
 
@@ -248,29 +353,28 @@ def modificar_empleado(id_empleado):
                     error_message = "La contraseña debe tener al menos 6 caracteres."
                     return render_template('editar-empleado.html', error_message=error_message)
                 payload['password'] = password
-            print(f"Payload enviado a la API para editar: {payload}")
+            logger.debug("Payload enviado a la API para editar: %s", payload)
 
+            anterior = api_client.get_by_id('empleados/getEmpleados', id_empleado, data_key='data', default={})
             response = api_client.put('empleados/updateEmpleado', json=payload)
 
             if response:
+                if anterior is not None and bool(anterior.get('is_admin')) != is_admin:
+                    contadores.incrementar('admins', 1 if is_admin else -1)
                 return redirect(url_for('empleados'))
             else:
                 error_message = response.get('message', 'Error desconocido al editar empleado.')
 
         except Exception as e:
-            print(f"Error al editar empleado: {e}")
+            logger.exception("Error al editar empleado: %s", e)
             return "Error al procesar la solicitud", 500
 
     try:
-        print("Obteniendo todos los empleados para buscar por ID...")
-        response = api_client.get('empleados/getEmpleados')
-
-        if response and 'data' in response:
-            empleados = response['data']
-            empleado_data = next((emp for emp in empleados if emp['id'] == id_empleado), None)
+        empleado_data = api_client.get_by_id('empleados/getEmpleados', id_empleado, data_key='data', default={})
 
+        if empleado_data is not None:
             if empleado_data:
-                print(f"Datos obtenidos del empleado: {empleado_data}")
+                logger.debug("Datos obtenidos del empleado: %s", empleado_data)
                 return render_template('editar-empleado.html', empleado=empleado_data, error_message=error_message)
             else:
                 return f"No se encontró un empleado con ID: {id_empleado}", 404
@@ -278,7 +382,7 @@ def modificar_empleado(id_empleado):
             return "Error al obtener empleados desde la API", 500
 
     except Exception as e:
-        print(f"Error al cargar datos del empleado: {e}")
+        logger.exception("Error al cargar datos del empleado: %s", e)
         return "Error interno al cargar los datos del empleado", 500
 
 
@@ -287,63 +391,206 @@ def modificar_empleado(id_empleado):
 # RUTA PARA ELIMINAR EMPLEADO
 @app.route('/empleados/eliminar/<string:id_empleado>', methods=['POST'])
 @login_required
+@fragmentos.invalida('empleados')
 def eliminar_empleado(id_empleado):
     try:
         payload = {'id': id_empleado}
-        print(f"Payload enviado a la API para eliminar: {payload}")
+        logger.debug("Payload enviado a la API para eliminar: %s", payload)
 
+        # Se lee antes de borrar para saber si también baja el contador de admins.
+        empleado = api_client.get_by_id('empleados/getEmpleados', id_empleado, data_key='data', default={})
         response = api_client.delete('empleados/deleteEmpleado', json=payload)
 
         if response and response.get('message') == 'Empleado eliminado con éxito':
-            print("Empleado eliminado correctamente.")
+            logger.info("Empleado %s eliminado correctamente.", id_empleado)
+            if empleado is None:
+                logger.warning("No se pudo leer el empleado %s: el contador de admins no se ajustó.", id_empleado)
+            contadores.incrementar_varios({
+                'empleados': -1,
+                'admins': -1 if empleado and empleado.get('is_admin') else 0
+            })
             return redirect(url_for('empleados', mensaje="Empleado eliminado con éxito"))
         else:
             error_message = response.get('message', 'Error desconocido al eliminar empleado.')
-            print(f"Error al eliminar empleado: {error_message}")
+            logger.warning("Error al eliminar empleado: %s", error_message)
             return redirect(url_for('empleados', mensaje=error_message))
 
     except Exception as e:
-        print(f"Error al eliminar empleado: {e}")
+        logger.exception("Error al eliminar empleado: %s", e)
         return redirect(url_for('empleados', mensaje="Error al procesar la solicitud"))
 
 # PEDIDOS
+def _formatear_pedido(doc):
+    """Convierte un documento de pedido en la fila que muestra la tabla."""
+    pedido = doc.to_dict()
+    pedido['id'] = doc.id
+    pedido['createdAt'] = exports.formatear_fecha(pedido.get('fecha_solicitud')) or 'No disponible'
+    pedido['status'] = 'Entregado' if pedido.get('is_entregado', False) else 'No Entregado'
+    pedido['prod'] = pedido.get('producto_id', 'No especificado')
+    pedido['userId'] = pedido.get('usuario_id', 'No especificado')
+    return pedido
+
+
+def _resumen_pedidos():
+    """(totales, entregados, no_entregados) desde memoria o, si aún no hay datos, por agregación."""
+    resumen = pedidos_stats.resumen()
+    if resumen is None:
+        totales = contadores.contar({
+            'pedidos_entregados': db.collection('pedidos').where('is_entregado', '==', True),
+            'pedidos_no_entregados': db.collection('pedidos').where('is_entregado', '==', False),
+        })
+        resumen = (
+            totales['pedidos_entregados'] + totales['pedidos_no_entregados'],
+            totales['pedidos_entregados'],
+            totales['pedidos_no_entregados'],
+        )
+    return resumen
+
+
 @app.route('/pedidos', methods=['GET'])
 @login_required
 def pedidos():
-    pedidos_list = []
+    # La página es solo el armazón de la tabla; los datos llegan por /pedidos/data.
+    version = (('pedidos',), None)
+    return conditional.sin_cambios(version) or conditional.versionar(
+        render_template('tb-pedido.html', is_admin=session.get('is_admin', False)), version
+    )
+
+
+# Columnas de tb-pedido.html que se pueden ordenar en el servidor.
+PEDIDOS_COLUMNAS_ORDENABLES = {3: 'is_entregado', 4: 'fecha_solicitud'}
+
+
+@app.route('/pedidos/data', methods=['GET'])
+@login_required
+def pedidos_data():
+    """Página de pedidos para DataTables (procesamiento en servidor)."""
+    # Por defecto se ordena por ID: ordenar por fecha_solicitud ocultaría los
+    # pedidos antiguos que no tienen ese campo.
+    params = datatables.parse_request(
+        request.args, PEDIDOS_COLUMNAS_ORDENABLES, (datatables.CAMPO_ID, True)
+    )
     try:
-        pedidos_ref = db.collection('pedidos')
-        snapshot = pedidos_ref.stream()
+        documentos, cursor = datatables.keyset_page(
+            db.collection('pedidos'),
+            params['campo'],
+            params['descendente'],
+            params['length'],
+            cursor=params['cursor'],
+            start=params['start'],
+        )
+        total = _resumen_pedidos()[0]
+    except Exception as e:
+        logger.exception("Error al obtener pedidos: %s", e)
+        return jsonify({"draw": params['draw'], "error": "Error al obtener pedidos"}), 500
+
+    filas = []
+    for doc in documentos:
+        pedido = _formatear_pedido(doc)
+        filas.append({
+            'id': pedido['id'],
+            'userId': pedido['userId'],
+            'prod': pedido['prod'],
+            'status': pedido['status'],
+            'createdAt': pedido['createdAt'],
+            'editar_url': url_for('modificar_pedido', id_pedido=pedido['id']),
+            'eliminar_url': url_for('eliminar_pedido', id_pedido=pedido['id']),
+        })
+
+    return jsonify({
+        "draw": params['draw'],
+        "recordsTotal": total,
+        "recordsFiltered": total,
+        "data": filas,
+        "cursor": cursor,
+    })
+
 
-        for doc in snapshot:
+# Columnas de las exportaciones, en orden.
+PEDIDOS_COLUMNAS_EXPORTACION = ['id', 'usuario_id', 'producto_id', 'direccion', 'is_entregado', 'fecha_solicitud']
+DISPOSITIVOS_COLUMNAS_EXPORTACION = [
+    'id', 'numero_telefonico', 'tipo_producto', 'plan_id', 'usuario_id', 'fecha_creacion'
+]
+
+
+def _respuesta_exportacion(nombre, columnas, filas):
+    """Respuesta en bloques (CSV o NDJSON según ?formato=) para el generador `filas`."""
+    formato = request.args.get('formato', 'csv')
+    if formato not in exports.FORMATOS:
+        return jsonify({"message": "Formato no soportado; use csv o ndjson."}), 400
+    return Response(
+        stream_with_context(exports.STREAMS[formato](filas, columnas)),
+        mimetype=exports.FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+@app.route('/pedidos/exportar', methods=['GET'])
+@login_required
+def exportar_pedidos():
+    """Exporta pedidos filtrados por ?desde=&hasta= (YYYY-MM-DD) y ?entregado=true|false.
+
+    Los documentos se leen de Firestore en páginas y se escriben a medida que
+    llegan, sin armar la lista completa en memoria.
+    """
+    try:
+        desde, hasta, entregado = exports.parse_filtros(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"Filtro inválido: {e}"}), 400
+
+    query = db.collection('pedidos')
+    if entregado is not None:
+        query = query.where('is_entregado', '==', entregado)
+    if desde is not None:
+        query = query.where('fecha_solicitud', '>=', desde)
+    if hasta is not None:
+        query = query.where('fecha_solicitud', '<', hasta)
+    # Sin filtro de fecha se ordena por ID para no perder los pedidos sin fecha_solicitud.
+    orden = 'fecha_solicitud' if desde is not None or hasta is not None else datatables.CAMPO_ID
+    query = query.select(PEDIDOS_COLUMNAS_EXPORTACION[1:]).order_by(orden)
+
+    def filas():
+        for doc in stream_in_pages(query):
             pedido = doc.to_dict()
             pedido['id'] = doc.id
-            fecha_solicitud = pedido.get('fecha_solicitud')
-
-            if fecha_solicitud:
-                from datetime import datetime
-                if isinstance(fecha_solicitud, datetime):
-                    timestamp = fecha_solicitud
-                elif hasattr(fecha_solicitud, 'seconds'):
-                    timestamp = datetime.fromtimestamp(fecha_solicitud.seconds)
-                else:
-                    timestamp = None
+            pedido['fecha_solicitud'] = exports.formatear_fecha(pedido.get('fecha_solicitud'))
+            yield pedido
+
+    return _respuesta_exportacion('pedidos', PEDIDOS_COLUMNAS_EXPORTACION, filas())
 
-                pedido['createdAt'] = timestamp.strftime('%Y-%m-%d %H:%M:%S') if timestamp else 'No disponible'
-            else:
-                pedido['createdAt'] = 'No disponible'
 
-            pedido['status'] = 'Entregado' if pedido.get('is_entregado', False) else 'No Entregado'
-            pedido['prod'] = pedido.get('producto_id', 'No especificado')
-            pedido['userId'] = pedido.get('usuario_id', 'No especificado')
+@app.route('/dispositivos/exportar', methods=['GET'])
+@login_required
+def exportar_dispositivos():
+    """Exporta dispositivos del backend filtrados por ?desde=&hasta= (fecha de creación).
 
-            pedidos_list.append(pedido)
+    La respuesta del backend se decodifica elemento por elemento mientras se
+    reenvía, sin cargar el arreglo completo.
+    """
+    try:
+        desde, hasta, _ = exports.parse_filtros(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"Filtro inválido: {e}"}), 400
+    desde = desde and desde.replace(tzinfo=timezone.utc).timestamp()
+    hasta = hasta and hasta.replace(tzinfo=timezone.utc).timestamp()
 
-        print(f"Pedidos obtenidos: {pedidos_list}")
-    except Exception as e:
-        print(f"Error al obtener pedidos: {e}")
+    def filas():
+        try:
+            for dispositivo in api_client.stream('dispositivos/getAllDispositivos'):
+                fecha = dispositivo.get('fecha_creacion')
+                if desde is not None or hasta is not None:
+                    segundos = exports.segundos_epoch(fecha)
+                    if segundos is None or (desde is not None and segundos < desde) \
+                            or (hasta is not None and segundos >= hasta):
+                        continue
+                dispositivo['fecha_creacion'] = exports.formatear_fecha(fecha)
+                yield dispositivo
+        except Exception as e:
+            # Los encabezados ya se enviaron; se corta la descarga y queda registrado.
+            logger.exception("Error al exportar dispositivos: %s", e)
+            raise
 
-    return render_template('tb-pedido.html', pedidos=pedidos_list, is_admin=session.get('is_admin', False))
+    return _respuesta_exportacion('dispositivos', DISPOSITIVOS_COLUMNAS_EXPORTACION, filas())
 
 
 @app.route('/modificar_pedido/<id_pedido>', methods=['GET', 'POST'])
@@ -357,9 +604,14 @@ def modificar_pedido(id_pedido):
                 "is_entregado": request.form.get('is_entregado') == 'true'
             }
 
-            print(f"Datos recibidos para actualizar el pedido {id_pedido}: {data}")
+            logger.debug("Datos recibidos para actualizar el pedido %s: %s", id_pedido, data)
 
-            db.collection('pedidos').document(id_pedido).update(data)
+            pedido_ref = db.collection('pedidos').document(id_pedido)
+            anterior = pedido_ref.get(field_paths=['is_entregado'])
+            pedido_ref.update(data)
+            pedidos_stats.registrar(id_pedido, data)
+            if anterior.exists:
+                contadores.ajustar_pedido(anterior.to_dict(), data)
             return redirect(url_for('pedidos'))
 
         pedido_doc = db.collection('pedidos').document(id_pedido).get()
@@ -369,7 +621,7 @@ def modificar_pedido(id_pedido):
         else:
             return "Pedido no encontrado", 404
     except Exception as e:
-        print(f"Error al modificar el pedido: {e}")
+        logger.exception("Error al modificar el pedido: %s", e)
         return "Error interno del servidor", 500
 
 
@@ -379,81 +631,152 @@ def eliminar_pedido(id_pedido):
     pedido_ref = db.collection('pedidos').document(id_pedido)
 
     try:
+        anterior = pedido_ref.get(field_paths=['is_entregado'])
         pedido_ref.delete()
-        print(f"Pedido {id_pedido} eliminado con éxito.")
+        pedidos_stats.eliminar(id_pedido)
+        if anterior.exists:
+            contadores.ajustar_pedido(anterior.to_dict(), None)
+        logger.info("Pedido %s eliminado con éxito.", id_pedido)
         return redirect(url_for('pedidos'))
     except Exception as e:
-        print(f"Error al eliminar el pedido {id_pedido}: {e}")
+        logger.exception("Error al eliminar el pedido %s: %s", id_pedido, e)
         return "Error al eliminar el pedido", 500
 
+
+# Cambios que aplica cada acción de /pedidos/lote (None elimina el pedido).
+PEDIDOS_ACCIONES_LOTE = {
+    'entregar': {'is_entregado': True},
+    'no_entregar': {'is_entregado': False},
+    'eliminar': None,
+}
+PEDIDOS_MAX_LOTE = int(os.getenv("PEDIDOS_MAX_LOTE", "5000"))
+
+
+@app.route('/pedidos/lote', methods=['POST'])
+@login_required
+def pedidos_lote():
+    """Marca como (no) entregados o elimina varios pedidos con escrituras en lote.
+
+    Recibe JSON {"accion": "entregar" | "no_entregar" | "eliminar", "ids": [...]}
+    y devuelve el resultado de cada pedido. Los pedidos se procesan en trozos
+    de hasta 500: una lectura get_all del estado anterior y un WriteBatch por
+    trozo, así un fallo solo afecta a los pedidos de su trozo.
+    """
+    datos = request.get_json(silent=True) or {}
+    accion = datos.get('accion')
+    ids = datos.get('ids')
+    if (accion not in PEDIDOS_ACCIONES_LOTE or not isinstance(ids, list)
+            or not all(isinstance(id_pedido, str) and id_pedido for id_pedido in ids)):
+        return jsonify({"message": "Se esperaba una acción válida y una lista de IDs."}), 400
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > PEDIDOS_MAX_LOTE:
+        return jsonify({"message": f"Se admiten hasta {PEDIDOS_MAX_LOTE} pedidos por lote."}), 400
+
+    nuevo = PEDIDOS_ACCIONES_LOTE[accion]
+    pedidos_ref = db.collection('pedidos')
+    errores = {}
+    for trozo in firestore_batch.trozos(ids):
+        referencias = {id_pedido: pedidos_ref.document(id_pedido) for id_pedido in trozo}
+        try:
+            anteriores = {
+                doc.id: doc.to_dict()
+                for doc in db.get_all(referencias.values(), field_paths=['is_entregado'])
+                if doc.exists
+            }
+        except Exception as e:
+            logger.exception("Error al leer un lote de %s pedidos: %s", len(trozo), e)
+            errores.update({id_pedido: "Error al leer el pedido" for id_pedido in trozo})
+            continue
+
+        operaciones = []
+        for id_pedido in trozo:
+            if id_pedido not in anteriores:
+                errores[id_pedido] = "Pedido no encontrado"
+            elif nuevo is None:
+                operaciones.append((id_pedido, 'delete', referencias[id_pedido], None))
+            else:
+                operaciones.append((id_pedido, 'update', referencias[id_pedido], nuevo))
+
+        aplicados = []
+        for id_pedido, error in firestore_batch.escribir_en_lote(db, operaciones).items():
+            if error is not None:
+                errores[id_pedido] = error
+                continue
+            aplicados.append(id_pedido)
+            if nuevo is None:
+                pedidos_stats.eliminar(id_pedido)
+            else:
+                pedidos_stats.registrar(id_pedido, nuevo)
+        contadores.ajustar_pedidos((anteriores[id_pedido], nuevo) for id_pedido in aplicados)
+
+    resultados = [
+        {'id': id_pedido, 'ok': id_pedido not in errores, 'error': errores.get(id_pedido)}
+        for id_pedido in ids
+    ]
+    logger.info("Lote de pedidos '%s': %s aplicados, %s con error.",
+                accion, len(ids) - len(errores), len(errores))
+    return jsonify({
+        "accion": accion,
+        "exitosos": len(ids) - len(errores),
+        "fallidos": len(errores),
+        "resultados": resultados,
+    })
+
 # PRODUCTOS
 @app.route('/productos', methods=['GET'])
 @login_required
 def productos():
     error_message = None
     productos = []
+    version = catalogo['productos'].marca()
+    no_modificado = conditional.sin_cambios(version)
+    if no_modificado:
+        return no_modificado
 
     try:
-        productos_data = db.collection('productos').stream()
-        productos = [{'id': doc.id, **doc.to_dict()} for doc in productos_data]
+        productos = catalogo['productos'].documentos()
     except Exception as e:
         error_message = f"Error al obtener los productos: {e}"
-        print(error_message)
+        logger.error("%s", error_message)
+        version = None
 
-    return render_template('tb-productos.html', productos=productos, error_message=error_message)
+    return conditional.versionar(
+        render_template('tb-productos.html', productos=productos, error_message=error_message,
+                        version_datos=version and version[0]),
+        version
+    )
 
 @app.route('/agregar_producto', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('productos')
 def agregar_producto():
     error_message = None
     if request.method == 'POST':
         try:
-            titulo = request.form.get('titulo')
-            descripcion = request.form.get('descripcion')
-            precio = request.form.get('precio')
             imagen = request.files.get('imagen')
-            tiny_descripcion = request.form.get('tinyDescripcion')
-
-            if not (titulo and descripcion and precio and imagen):
-                error_message = "Todos los campos obligatorios deben completarse."
-                raise ValueError(error_message)
-
-            filename, ext = os.path.splitext(imagen.filename)
-            ext = ext.lower()
-            if ext not in ['.png', '.jpg', '.jpeg']:
-                ext = '.png'
-            converted_filename = f"{filename}{ext}"
-
-            image = Image.open(imagen)
-            image_io = io.BytesIO()
-            image.save(image_io, format='PNG' if ext == '.png' else 'JPEG')
-            image_io.seek(0)
-
-            blob = bucket.blob(f"productos/{converted_filename}")
-            blob.upload_from_file(image_io, content_type=f"image/{'png' if ext == '.png' else 'jpeg'}")
-            blob.make_public()
-            imagen_url = blob.public_url
+            if not imagen:
+                raise ValueError("Todos los campos obligatorios deben completarse.")
 
             producto_data = {
-                'titulo': titulo,
-                'descripcion': descripcion,
-                'precio': float(precio),
-                'imagen': imagen_url,
-                'tiny_descripcion': tiny_descripcion,
+                **catalog_forms.validar_producto(request.form),
+                'imagen_estado': 'pendiente',
                 'fecha_creacion': datetime.utcnow()
             }
-            db.collection('productos').add(producto_data)
+            recibida = recibir_imagen(imagen)
+            _, producto_ref = db.collection('productos').add(producto_data)
+            programar_imagen(producto_ref, recibida, 'productos')
 
             return redirect(url_for('productos'))
         except Exception as e:
             error_message = f"Error al procesar el formulario: {e}"
-            print(error_message)
+            logger.error("%s", error_message)
 
     return render_template('agregar-producto.html', error_message=error_message)
 
 
 @app.route('/modificar_producto/<string:id_producto>', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('productos')
 def modificar_producto(id_producto):
     error_message = None
     producto_ref = db.collection('productos').document(id_producto)
@@ -474,28 +797,18 @@ def modificar_producto(id_producto):
                 'ult_actualizacion': datetime.utcnow()
             }
 
+            recibida = None
             if imagen:
-                filename, ext = os.path.splitext(imagen.filename)
-                ext = ext.lower()
-                if ext not in ['.png', '.jpg', '.jpeg']:
-                    ext = '.png'
-                converted_filename = f"{filename}{ext}"
-
-                image = Image.open(imagen)
-                image_io = io.BytesIO()
-                image.save(image_io, format='PNG' if ext == '.png' else 'JPEG')
-                image_io.seek(0)
-
-                blob = bucket.blob(f"productos/{converted_filename}")
-                blob.upload_from_file(image_io, content_type=f"image/{'png' if ext == '.png' else 'jpeg'}")
-                blob.make_public()
-                updates['imagen'] = blob.public_url
+                recibida = recibir_imagen(imagen)
+                updates['imagen_estado'] = 'pendiente'
 
             producto_ref.update(updates)
+            if recibida:
+                programar_imagen(producto_ref, recibida, 'productos')
             return redirect(url_for('productos'))
         except Exception as e:
             error_message = f"Error al actualizar el producto: {str(e)}"
-            print(error_message)
+            logger.error("%s", error_message)
 
     producto = producto_ref.get()
     if producto.exists:
@@ -508,6 +821,123 @@ def modificar_producto(id_producto):
 
 
 
+def recibir_imagen(imagen):
+    """Copia la imagen del formulario a un temporal y devuelve (datos, filename).
+
+    La copia (en memoria solo si es pequeña) es necesaria porque el stream
+    del formulario se cierra al terminar la petición. Lanza ImagenInvalida
+    si supera IMAGE_MAX_BYTES, así que debe llamarse antes de escribir el
+    documento para no dejarlo en 'pendiente' sin imagen.
+    """
+    return image_pipeline.spool(imagen.stream), imagen.filename
+
+
+def programar_imagen(doc_ref, recibida, carpeta):
+    """Sube la imagen de `recibir_imagen` en segundo plano y actualiza `doc_ref` cuando termina.
+
+    El ID del trabajo queda en `imagen_job` del documento para consultar su
+    estado en /uploads/<job_id>. Si la cola está llena la subida se hace en
+    el momento, lo que frena al llamador hasta que haya capacidad; si falla,
+    el documento queda con `imagen_estado` en 'error' igual que en segundo
+    plano.
+    """
+    datos, filename = recibida
+
+    def tarea():
+        datos.seek(0)
+        campos = image_pipeline.ingestar(bucket, datos, carpeta, filename=filename)
+        doc_ref.update({**campos, 'imagen_estado': 'listo'})
+        datos.close()
+
+    def al_fallar(error):
+        datos.close()
+        doc_ref.update({'imagen_estado': 'error'})
+
+    try:
+        job_id = upload_queue.submit(tarea, descripcion=f"{carpeta}/{filename}", al_fallar=al_fallar)
+    except UploadQueueFull:
+        logger.warning("Cola de subidas llena, subiendo %s en la petición.", filename)
+        try:
+            tarea()
+        except Exception as e:
+            logger.error("Error al subir %s en la petición: %s", filename, e)
+            try:
+                al_fallar(str(e))
+            except Exception as e:
+                logger.error("Error al registrar el fallo de la subida de %s: %s", filename, e)
+        return None
+
+    doc_ref.update({'imagen_job': job_id})
+    return job_id
+
+
+@app.route('/uploads/<string:job_id>', methods=['GET'])
+@login_required
+def estado_subida(job_id):
+    job = upload_queue.estado(job_id)
+    if job is None:
+        return jsonify({"message": "Subida no encontrada"}), 404
+    return jsonify(job)
+
+
+# Hosts desde los que la importación puede descargar imágenes (separados por coma).
+IMPORT_IMAGE_HOSTS = [
+    host.strip() for host in os.getenv("IMPORT_IMAGE_HOSTS", ",".join(catalog_import.HOSTS_IMAGENES)).split(",")
+    if host.strip()
+]
+
+
+@app.route('/catalogo/importar/<string:coleccion>', methods=['POST'])
+@login_required
+def importar_catalogo(coleccion):
+    """Importa productos o planes desde un CSV/NDJSON subido en `archivo`.
+
+    El archivo se copia a disco y se procesa en segundo plano; la respuesta
+    trae la URL para consultar el progreso y los errores por fila.
+    """
+    if not session.get('is_admin'):
+        return jsonify({"message": "No autorizado"}), 403
+    if coleccion not in catalog_import.VALIDADORES:
+        return jsonify({"message": "Colección no importable"}), 404
+
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return jsonify({"message": "No se subió ningún archivo"}), 400
+    formato = request.form.get('formato') or catalog_import.detectar_formato(archivo.filename)
+    if formato not in catalog_import.FORMATOS:
+        return jsonify({"message": "Formato no soportado; use CSV o NDJSON."}), 400
+
+    copia = tempfile.TemporaryFile()
+    shutil.copyfileobj(archivo.stream, copia, image_pipeline.CHUNK_SIZE)
+    copia.seek(0)
+
+    importador = catalog_import.CatalogImporter(
+        db, bucket, coleccion, contadores=contadores,
+        max_workers=int(os.getenv("IMPORT_IMAGE_WORKERS", "4")),
+        hosts_imagenes=IMPORT_IMAGE_HOSTS
+    )
+    job_id = importaciones.iniciar(importador, copia, formato)
+    return jsonify({
+        "id": job_id,
+        "estado_url": url_for('estado_importacion', job_id=job_id),
+    }), 202
+
+
+@app.route('/catalogo/importaciones/<string:job_id>', methods=['GET'])
+@login_required
+def estado_importacion(job_id):
+    estado = importaciones.estado(job_id)
+    if estado is None:
+        return jsonify({"message": "Importación no encontrada"}), 404
+    return jsonify(estado)
+
+
+@app.route('/catalogo/estado', methods=['GET'])
+@login_required
+def estado_catalogo():
+    return jsonify({nombre: replica.estado() for nombre, replica in catalogo.items()})
+
+
 @app.route('/upload_image', methods=['POST'])
 def upload_image():
     if 'imagen' not in request.files:
@@ -525,15 +955,16 @@ def upload_image():
 
 @app.route('/eliminar_producto/<string:id_producto>', methods=['POST'])
 @login_required
+@fragmentos.invalida('productos')
 def eliminar_producto(id_producto):
     try:
         producto_ref = db.collection('productos').document(id_producto)
 
         producto_ref.delete()
-        print(f"Producto {id_producto} eliminado de Firestore.")
+        logger.info("Producto %s eliminado de Firestore.", id_producto)
         return redirect(url_for('productos'))
     except Exception as e:
-        print(f"Error al eliminar el producto {id_producto}: {e}")
+        logger.exception("Error al eliminar el producto %s: %s", id_producto, e)
         return redirect(url_for('productos', mensaje="Error al eliminar el producto"))
 
 
@@ -543,6 +974,9 @@ def eliminar_producto(id_producto):
 def dispositivos():
     error_message = None
     dispositivos = []
+    no_modificado = conditional.sin_cambios(api_client.marca('dispositivos/getAllDispositivos'))
+    if no_modificado:
+        return no_modificado
 
     try:
         response = api_client.get('dispositivos/getAllDispositivos')
@@ -554,11 +988,15 @@ def dispositivos():
     except Exception as e:
         error_message = f"Error al obtener dispositivos: {str(e)}"
 
-    return render_template('tb-dispositivo.html', dispositivos=dispositivos, error_message=error_message)
+    version = None if error_message else api_client.marca('dispositivos/getAllDispositivos')
+    html = render_template('tb-dispositivo.html', dispositivos=dispositivos, error_message=error_message,
+                           version_datos=version and version[0])
+    return conditional.versionar(html, version)
 
 
 @app.route('/agregar_dispositivo', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('dispositivos')
 def agregar_dispositivo():
     error_message = None
 
@@ -577,20 +1015,21 @@ def agregar_dispositivo():
             try:
                 response = api_client.post('dispositivos/createDispositivo', json=payload)
                 if response and response.get('message') == 'Dispositivo creado exitosamente':
+                    contadores.incrementar('dispositivos')
                     return redirect(url_for('dispositivos'))
                 else:
                     error_message = response.get('message', 'Error al agregar el dispositivo.')
             except Exception as e:
                 error_message = f"Error al agregar el dispositivo: {str(e)}"
 
-    productos_query = db.collection('productos').stream()
-    productos = [{'id': doc.id, 'titulo': doc.to_dict().get('titulo')} for doc in productos_query]
+    productos = catalogo['productos'].documentos(campos=['titulo'])
 
     return render_template('agregar-dispositivo.html', productos=productos, error_message=error_message)
 
 
 @app.route('/modificar_dispositivo/<string:id_dispositivo>', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('dispositivos')
 def modificar_dispositivo(id_dispositivo):
     error_message = None
     dispositivo = {}
@@ -621,26 +1060,19 @@ def modificar_dispositivo(id_dispositivo):
                 error_message = f"Error al actualizar el dispositivo: {str(e)}"
 
     try:
-        response = api_client.get('dispositivos/getAllDispositivos')
-        if response:
-            dispositivos = response
-            dispositivo = next((d for d in dispositivos if d['id'] == id_dispositivo), None)
-
+        dispositivo = api_client.get_by_id('dispositivos/getAllDispositivos', id_dispositivo, default={})
+        if dispositivo is not None:
             if dispositivo:
                 usuarios_invitados = dispositivo.get('usuarios_invitados', [])
                 usuario_id = dispositivo.get('usuario_id')
-                emails_invitados = []
-                for user_id in usuarios_invitados:
-                    user_response = api_client.get(f'usuarios/{user_id}')
-                    if user_response and user_response.get('correo'):
-                        emails_invitados.append(user_response['correo'])
-                    else:
-                        emails_invitados.append(f"Usuario ID {user_id} no disponible")
-
-                dispositivo['usuarios_invitados'] = emails_invitados
+                correos = user_resolver.resolve_many([*usuarios_invitados, usuario_id])
+
+                dispositivo['usuarios_invitados'] = [
+                    correos.get(user_id) or f"Usuario ID {user_id} no disponible"
+                    for user_id in usuarios_invitados
+                ]
                 if usuario_id:
-                    user_response = api_client.get(f'usuarios/{usuario_id}')
-                    dispositivo['usuario_id'] = user_response.get('correo', 'Correo no disponible')
+                    dispositivo['usuario_id'] = correos.get(usuario_id) or 'Correo no disponible'
             else:
                 error_message = "Dispositivo no encontrado."
         else:
@@ -648,27 +1080,29 @@ def modificar_dispositivo(id_dispositivo):
     except Exception as e:
         error_message = f"Error al cargar los datos del dispositivo: {str(e)}"
 
-    return render_template('editar-dispositivo.html', dispositivo=dispositivo, error_message=error_message)
+    return render_template('editar-dispositivo.html', dispositivo=dispositivo or {}, error_message=error_message)
 
 
 @app.route('/eliminar_dispositivo/<string:id_dispositivo>', methods=['POST'])
 @login_required
+@fragmentos.invalida('dispositivos')
 def eliminar_dispositivo(id_dispositivo):
     try:
         payload = {'deviceId': id_dispositivo}
-        print(f"Payload enviado a la API para eliminar: {payload}")
+        logger.debug("Payload enviado a la API para eliminar: %s", payload)
 
         response = api_client.delete('dispositivos/deleteDispositivo', json=payload)
 
         if response and response.get('message') == 'Dispositivo eliminado exitosamente':
-            print("Dispositivo eliminado correctamente.")
+            logger.info("Dispositivo %s eliminado correctamente.", id_dispositivo)
+            contadores.incrementar('dispositivos', -1)
             return redirect(url_for('dispositivos'))
         else:
             error_message = response.get('message', 'Error al eliminar el dispositivo.')
-            print(f"Error al eliminar dispositivo: {error_message}")
+            logger.warning("Error al eliminar dispositivo: %s", error_message)
             return redirect(url_for('dispositivos', mensaje=error_message))
     except Exception as e:
-        print(f"Error al eliminar dispositivo: {e}")
+        logger.exception("Error al eliminar dispositivo: %s", e)
         return redirect(url_for('dispositivos', mensaje="Error al procesar la solicitud"))
 
 
@@ -676,66 +1110,53 @@ def eliminar_dispositivo(id_dispositivo):
 @login_required
 def planes():
     mensaje = request.args.get('mensaje', None)
+    version = catalogo['planes'].marca()
+    no_modificado = conditional.sin_cambios(version)
+    if no_modificado:
+        return no_modificado
     try:
-        planes_query = db.collection('planes').stream()
-        planes = [{'id': doc.id, **doc.to_dict()} for doc in planes_query]
-        return render_template('tb-planes.html', planes=planes, mensaje=mensaje)
+        planes = catalogo['planes'].documentos()
+        return conditional.versionar(
+            render_template('tb-planes.html', planes=planes, mensaje=mensaje, version_datos=version and version[0]),
+            version
+        )
     except Exception as e:
-        print(f"Error al obtener planes: {e}")
+        logger.exception("Error al obtener planes: %s", e)
         return render_template('tb-planes.html', planes=[], mensaje="Error al obtener los planes.")
 
 
 @app.route('/planes/agregar', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('planes')
 def agregar_plan():
     error_message = None
     if request.method == 'POST':
         try:
-            nombre = request.form.get('nombre')
-            precio = float(request.form.get('precio'))
-            descripcion = request.form.get('descripcion')
-            refresco = int(request.form.get('refresco'))
-            cantidad_compartidos = int(request.form.get('cantidad_compartidos'))
             imagen = request.files.get('imagen')
-
-            if not all([nombre, precio, descripcion, refresco, cantidad_compartidos, imagen]):
+            if not imagen:
                 raise ValueError("Todos los campos son obligatorios.")
 
-            filename, ext = os.path.splitext(imagen.filename)
-            ext = ext.lower()
-            if ext not in ['.png', '.jpg', '.jpeg']:
-                ext = '.png'
-            converted_filename = f"planes/{filename}{ext}"
-
-            image = Image.open(imagen)
-            image_io = io.BytesIO()
-            image.save(image_io, format='PNG' if ext == '.png' else 'JPEG')
-            image_io.seek(0)
-            blob = bucket.blob(converted_filename)
-            blob.upload_from_file(image_io, content_type=f"image/{'png' if ext == '.png' else 'jpeg'}")
-            blob.make_public()
-            imagen_url = blob.public_url
             plan_data = {
-                'nombre': nombre,
-                'precio': precio,
-                'descripcion': descripcion,
-                'refresco': refresco,
-                'cantidad_compartidos': cantidad_compartidos,
-                'imagen': imagen_url,
+                **catalog_forms.validar_plan(request.form),
+                'imagen_estado': 'pendiente',
                 'fecha_creacion': datetime.utcnow()
             }
-            db.collection('planes').add(plan_data)
+            recibida = recibir_imagen(imagen)
+            _, plan_ref = db.collection('planes').add(plan_data)
+            programar_imagen(plan_ref, recibida, 'planes')
+            contadores.incrementar('planes')
 
             return redirect(url_for('planes', mensaje="Plan agregado con éxito"))
         except Exception as e:
             error_message = f"Error al agregar el plan: {e}"
-            print(error_message)
+            logger.error("%s", error_message)
 
     return render_template('agregar-planes.html', error_message=error_message)
 
 
 @app.route('/planes/editar/<string:id_plan>', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('planes')
 def modificar_plan(id_plan):
     error_message = None
     plan_ref = db.collection('planes').document(id_plan)
@@ -757,26 +1178,17 @@ def modificar_plan(id_plan):
                 'cantidad_compartidos': cantidad_compartidos,
                 'ult_actualizacion': datetime.utcnow()
             }
+            recibida = None
             if imagen:
-                filename, ext = os.path.splitext(imagen.filename)
-                ext = ext.lower()
-                if ext not in ['.png', '.jpg', '.jpeg']:
-                    ext = '.png'
-                converted_filename = f"planes/{filename}{ext}"
-
-                image = Image.open(imagen)
-                image_io = io.BytesIO()
-                image.save(image_io, format='PNG' if ext == '.png' else 'JPEG')
-                image_io.seek(0)
-                blob = bucket.blob(converted_filename)
-                blob.upload_from_file(image_io, content_type=f"image/{'png' if ext == '.png' else 'jpeg'}")
-                blob.make_public()
-                updates['imagen'] = blob.public_url
+                recibida = recibir_imagen(imagen)
+                updates['imagen_estado'] = 'pendiente'
             plan_ref.update(updates)
+            if recibida:
+                programar_imagen(plan_ref, recibida, 'planes')
             return redirect(url_for('planes', mensaje="Plan actualizado con éxito"))
         except Exception as e:
             error_message = f"Error al actualizar el plan: {e}"
-            print(error_message)
+            logger.error("%s", error_message)
 
     plan = plan_ref.get()
     if plan.exists:
@@ -788,28 +1200,40 @@ def modificar_plan(id_plan):
 
 @app.route('/planes/eliminar/<string:id_plan>', methods=['POST'])
 @login_required
+@fragmentos.invalida('planes')
 def eliminar_plan(id_plan):
     try:
         plan_ref = db.collection('planes').document(id_plan)
-        plan_ref.delete()
-        print(f"Plan {id_plan} eliminado de Firestore.")
+        if plan_ref.get(field_paths=[]).exists:
+            plan_ref.delete()
+            contadores.incrementar('planes', -1)
+        logger.info("Plan %s eliminado de Firestore.", id_plan)
         return redirect(url_for('planes', mensaje="Plan eliminado con éxito"))
     except Exception as e:
-        print(f"Error al eliminar el plan {id_plan}: {e}")
+        logger.exception("Error al eliminar el plan %s: %s", id_plan, e)
         return redirect(url_for('planes', mensaje="Error al eliminar el plan"))
 
 @app.route('/tiponotificaciones', methods=['GET'])
 @login_required
 def tiponotificaciones():
     try:
+        no_modificado = conditional.sin_cambios(api_client.marca('notificaciones/getTiposNotificaciones'))
+        if no_modificado:
+            return no_modificado
+
         response = api_client.get('notificaciones/getTiposNotificaciones')
         if response:
             tipos_notificaciones = response
-            return render_template('tb-tipo_notificaciones.html', tipos_notificaciones=tipos_notificaciones)
+            version = api_client.marca('notificaciones/getTiposNotificaciones')
+            return conditional.versionar(
+                render_template('tb-tipo_notificaciones.html', tipos_notificaciones=tipos_notificaciones,
+                                version_datos=version and version[0]),
+                version
+            )
         else:
             return render_template('tb-tipo_notificaciones.html', tipos_notificaciones=[], mensaje="Error al obtener los datos.")
     except Exception as e:
-        print(f"Error al obtener tipos de notificación: {e}")
+        logger.exception("Error al obtener tipos de notificación: %s", e)
         return render_template('tb-tipo_notificaciones.html', tipos_notificaciones=[], mensaje="Error interno del servidor.")
 
 
@@ -817,6 +1241,7 @@ def tiponotificaciones():
 
 @app.route('/tiponotificaciones/agregar', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('tiponotificaciones')
 def agregar_tiponotificacion():
     if request.method == 'POST':
         try:
@@ -838,12 +1263,13 @@ def agregar_tiponotificacion():
             else:
                 raise ValueError("Error al agregar el tipo de notificación.")
         except Exception as e:
-            print(f"Error al agregar tipo de notificación: {e}")
+            logger.exception("Error al agregar tipo de notificación: %s", e)
     return render_template('agregar-tiponotificaciones.html')
 
 
 @app.route('/tiponotificaciones/editar/<string:id_tipo>', methods=['GET', 'POST'])
 @login_required
+@fragmentos.invalida('tiponotificaciones')
 def editar_tiponotificacion(id_tipo):
     if request.method == 'POST':
         try:
@@ -865,15 +1291,15 @@ def editar_tiponotificacion(id_tipo):
             else:
                 raise ValueError("Error al editar el tipo de notificación.")
         except Exception as e:
-            print(f"Error al editar tipo de notificación: {e}")
+            logger.exception("Error al editar tipo de notificación: %s", e)
 
-    response = api_client.get('notificaciones/getTiposNotificaciones')
-    tipo = next((t for t in response if t['id'] == id_tipo), None) if response else None
+    tipo = api_client.get_by_id('notificaciones/getTiposNotificaciones', id_tipo)
     return render_template('editar-tiponotificaciones.html', tipo=tipo)
 
 
 @app.route('/tiponotificaciones/eliminar/<string:id_tipo>', methods=['POST'])
 @login_required
+@fragmentos.invalida('tiponotificaciones')
 def eliminar_tiponotificacion(id_tipo):
     try:
         payload = {'id': id_tipo}
@@ -884,7 +1310,7 @@ def eliminar_tiponotificacion(id_tipo):
         else:
             raise ValueError("Error al eliminar el tipo de notificación.")
     except Exception as e:
-        print(f"Error al eliminar tipo de notificación: {e}")
+        logger.exception("Error al eliminar tipo de notificación: %s", e)
         return redirect(url_for('tiponotificaciones', mensaje="Error interno del servidor."))
 
 
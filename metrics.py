@@ -0,0 +1,174 @@
+import bisect
+import threading
+
+
+# Límites (en segundos) de los histogramas de latencia.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+class Counter:
+    """Contador acumulativo con etiquetas."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores):
+        with self._lock:
+            return self._valores.get(valores, 0)
+
+    def muestras(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        for claves, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, claves)} {valor}"
+
+
+class Gauge(Counter):
+    """Valor que puede subir o bajar."""
+
+    tipo = 'gauge'
+
+    def set(self, *valores, valor):
+        with self._lock:
+            self._valores[valores] = valor
+
+
+class Histogram:
+    """Histograma de cubetas fijas con etiquetas."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=LATENCY_BUCKETS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, valor, *valores):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # [cuentas por cubeta..., +Inf, suma]
+                serie = self._series[valores] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[indice] += 1
+            serie[-1] += valor
+
+    def muestras(self):
+        with self._lock:
+            series = [(claves, list(serie)) for claves, serie in self._series.items()]
+        for claves, serie in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + ('+Inf',), serie[:-1]):
+                acumulado += cuenta
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, claves, ('le', limite))} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, claves)} {serie[-1]}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, claves)} {acumulado}"
+
+
+class Registry:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, nombre, ayuda, etiquetas=()):
+        return self.registrar(Counter(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre, ayuda, etiquetas=()):
+        return self.registrar(Gauge(nombre, ayuda, etiquetas))
+
+    def histogram(self, nombre, ayuda, etiquetas=(), buckets=LATENCY_BUCKETS):
+        return self.registrar(Histogram(nombre, ayuda, etiquetas, buckets))
+
+    def exponer(self):
+        """Todas las métricas en el formato de texto de Prometheus."""
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.muestras())
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRY = Registry()
+
+http_request_seconds = REGISTRY.histogram(
+    'arfind_http_request_duration_seconds', 'Latencia de las rutas de Flask.',
+    ('route', 'method', 'status'))
+
+api_request_seconds = REGISTRY.histogram(
+    'arfind_api_request_duration_seconds', 'Latencia de las llamadas de APIClient al backend.',
+    ('endpoint', 'method', 'status'))
+
+firestore_operation_seconds = REGISTRY.histogram(
+    'arfind_firestore_operation_duration_seconds', 'Duración de las operaciones de Firestore.',
+    ('collection', 'operation'))
+
+firestore_documents_read = REGISTRY.counter(
+    'arfind_firestore_documents_read_total', 'Documentos leídos de Firestore.',
+    ('collection',))
+
+storage_upload_seconds = REGISTRY.histogram(
+    'arfind_storage_upload_duration_seconds', 'Duración de las subidas a Firebase Storage.',
+    ('folder',))
+
+storage_upload_bytes = REGISTRY.counter(
+    'arfind_storage_upload_bytes_total', 'Bytes subidos a Firebase Storage.',
+    ('folder',))
+
+catalog_direct_reads = REGISTRY.counter(
+    'arfind_catalog_direct_reads_total',
+    'Lecturas de catálogo servidas directo de Firestore por no tener la copia en memoria.',
+    ('collection',))
+
+api_circuit_state = REGISTRY.gauge(
+    'arfind_api_circuit_state', 'Estado del circuito por host del backend (0 cerrado, 1 semiabierto, 2 abierto).',
+    ('host',))
+
+api_circuit_rejections = REGISTRY.counter(
+    'arfind_api_circuit_rejections_total', 'Llamadas al backend cortadas por el circuito abierto.',
+    ('host',))
+
+api_retries = REGISTRY.counter(
+    'arfind_api_retries_total', 'Reintentos de GET al backend.',
+    ('endpoint',))
+
+api_stale_responses = REGISTRY.counter(
+    'arfind_api_stale_responses_total', 'Respuestas GET servidas desde la última copia buena por fallo del backend.',
+    ('endpoint',))
+
+single_flight_shared = REGISTRY.counter(
+    'arfind_single_flight_shared_total', 'Lecturas que esperaron el resultado de una lectura idéntica en curso.',
+    ('group',))
+
+fragment_cache_requests = REGISTRY.counter(
+    'arfind_fragment_cache_requests_total', 'Consultas a la caché de fragmentos HTML por resultado (hit/miss).',
+    ('fragment', 'result'))
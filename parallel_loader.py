@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import copy_current_request_context, g, has_app_context, has_request_context
+
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_HILOS = "parallel-loader"
+
+
+class Resultados(dict):
+    """Valores de `gather` por nombre; los que fallaron quedan en `errores`."""
+
+    def __init__(self):
+        super().__init__()
+        self.errores = {}
+
+
+class ParallelLoader:
+    """Ejecuta lecturas independientes en un pool de hilos compartido y acotado.
+
+    Las vistas declaran sus lecturas con `gather(nombre=callable, ...)` y la
+    latencia pasa a ser la de la más lenta en vez de la suma de todas. Un
+    fallo o un timeout de una lectura no afecta a las demás.
+    """
+
+    def __init__(self, max_workers=16, timeout=10):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=PREFIJO_HILOS)
+
+    def _preparar(self, cargador):
+        """Adapta `cargador` para que vea el contexto de Flask de la petición en curso."""
+        if not has_request_context():
+            return cargador
+        # El contexto copiado trae un `g` nuevo; se le pasan los datos de la
+        # petición (traza de Firestore, request_id...).
+        datos_g = dict(g.__dict__) if has_app_context() else {}
+
+        @copy_current_request_context
+        def ejecutar():
+            g.__dict__.update(datos_g)
+            return cargador()
+
+        return ejecutar
+
+    def gather(self, timeout=None, **cargadores):
+        """Ejecuta los callables sin argumentos de `cargadores` en paralelo.
+
+        Devuelve Resultados {nombre: valor}; los que lanzaron una excepción o
+        no terminaron en `timeout` segundos (por defecto el del cargador)
+        quedan fuera del dict y con su excepción en `errores`.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        resultados = Resultados()
+        if not cargadores:
+            return resultados
+
+        if len(cargadores) == 1 or threading.current_thread().name.startswith(PREFIJO_HILOS):
+            # Una sola lectura, o una llamada anidada desde el propio pool
+            # (esperar a otra tarea del pool podría bloquearlo): en el hilo actual.
+            for nombre, cargador in cargadores.items():
+                try:
+                    resultados[nombre] = cargador()
+                except Exception as e:
+                    logger.warning("Error al cargar '%s': %s", nombre, e)
+                    resultados.errores[nombre] = e
+            return resultados
+
+        inicio = time.monotonic()
+        tareas = {
+            nombre: self._executor.submit(self._preparar(cargador))
+            for nombre, cargador in cargadores.items()
+        }
+        wait(tareas.values(), timeout=timeout)
+
+        for nombre, tarea in tareas.items():
+            if not tarea.done():
+                tarea.cancel()
+                logger.warning("'%s' no terminó en %.1f s.", nombre, time.monotonic() - inicio)
+                resultados.errores[nombre] = TimeoutError(f"'{nombre}' superó el timeout de {timeout} s.")
+                continue
+            error = tarea.exception()
+            if error is not None:
+                logger.warning("Error al cargar '%s': %s", nombre, error)
+                resultados.errores[nombre] = error
+            else:
+                resultados[nombre] = tarea.result()
+        return resultados
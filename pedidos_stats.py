@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class PedidosStats:
+    """Totales de pedidos mantenidos en memoria.
+
+    Se siembran con la primera instantánea de un listener `on_snapshot` sobre
+    la colección y se actualizan de forma incremental con cada cambio, así
+    las vistas de resumen no recorren la colección en cada petición. Si el
+    listener se desconecta los totales dejan de considerarse vigentes
+    (`resumen()` devuelve None y el llamador recurre a la agregación) y se
+    intenta volver a registrarlo cada `reintento` segundos.
+    """
+
+    def __init__(self, db, coleccion='pedidos', reintento=30):
+        self.db = db
+        self.coleccion = coleccion
+        self.reintento = reintento
+        self._estados = {}
+        self._entregados = 0
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._watch = None
+        self._ultimo_intento = 0.0
+
+    def iniciar(self):
+        """Registra el listener sobre la colección de pedidos."""
+        with self._lock:
+            if self._watch is not None and self._watch_activo():
+                return
+            self._ultimo_intento = time.monotonic()
+            if self._watch is not None:
+                self._cerrar_watch()
+            # La primera instantánea del nuevo listener trae todos los pedidos.
+            self._listo.clear()
+            self._estados = {}
+            self._entregados = 0
+        try:
+            watch = self.db.collection(self.coleccion).on_snapshot(self._on_snapshot)
+        except Exception as e:
+            logger.error("Error al iniciar el listener de %s: %s", self.coleccion, e)
+            return
+        with self._lock:
+            self._watch = watch
+
+    def detener(self):
+        """Cancela el listener; los totales dejan de considerarse vigentes."""
+        with self._lock:
+            self._cerrar_watch()
+            self._listo.clear()
+
+    def _cerrar_watch(self):
+        if self._watch is None:
+            return
+        try:
+            self._watch.unsubscribe()
+        except Exception as e:
+            logger.warning("Error al cerrar el listener de %s: %s", self.coleccion, e)
+        self._watch = None
+
+    def _watch_activo(self):
+        # `is_active` es False cuando el stream del listener terminó por un error.
+        return getattr(self._watch, 'is_active', True)
+
+    def _on_snapshot(self, snapshot, cambios, read_time):
+        for cambio in cambios:
+            documento = cambio.document
+            if cambio.type.name == 'REMOVED':
+                self.eliminar(documento.id)
+            else:
+                self.registrar(documento.id, documento.to_dict() or {})
+        self._listo.set()
+
+    def registrar(self, id_pedido, datos):
+        """Aplica el alta o modificación de un pedido a los totales."""
+        if 'is_entregado' not in datos and id_pedido in self._estados:
+            return
+        entregado = bool(datos.get('is_entregado'))
+        with self._lock:
+            anterior = self._estados.get(id_pedido)
+            self._estados[id_pedido] = entregado
+            self._entregados += int(entregado) - int(bool(anterior))
+
+    def eliminar(self, id_pedido):
+        """Quita un pedido de los totales."""
+        with self._lock:
+            anterior = self._estados.pop(id_pedido, None)
+            if anterior:
+                self._entregados -= 1
+
+    @property
+    def listo(self):
+        """Indica si ya se recibió la instantánea inicial y el listener sigue conectado."""
+        if self._watch is not None and not self._watch_activo():
+            self._listo.clear()
+        return self._listo.is_set() and self._watch is not None
+
+    def _reconectar(self):
+        if self._watch is not None and self._watch_activo():
+            # Registrado pero todavía sin la primera instantánea.
+            return
+        if time.monotonic() - self._ultimo_intento < self.reintento:
+            return
+        if self._watch is not None:
+            logger.warning("Listener de %s desconectado; se vuelve a registrar.", self.coleccion)
+        self.iniciar()
+
+    def resumen(self):
+        """Devuelve (totales, entregados, no_entregados) o None si los totales no están vigentes."""
+        if not self.listo:
+            self._reconectar()
+            return None
+        with self._lock:
+            totales = len(self._estados)
+            return totales, self._entregados, totales - self._entregados
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Caché LRU con expiración (TTL) para respuestas de la API.
+
+    Cada entrada guarda el momento en que vence; al superar `max_entries`
+    se descarta la usada hace más tiempo. Los valores no se copian: quien
+    guarda y quien lee comparten el mismo objeto, que debe tratarse como de
+    solo lectura (el llamador que necesite modificarlo hace su propia copia).
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Devuelve el valor vigente para `key` o None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def get_item(self, key, item):
+        """Devuelve (encontrado, valor) de `item` dentro de un dict cacheado.
+
+        Las búsquedas por ID en un índice cacheado cuestan O(1).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1].get(item)
+        return True, value
+
+    def set(self, key, value, ttl):
+        """Guarda `value` durante `ttl` segundos."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        """Elimina las entradas cuya clave cumple `predicate`."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Contadores de uso de la caché."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,60 @@
+import copy
+import threading
+
+import metrics
+
+
+class _Vuelo:
+    __slots__ = ('listo', 'resultado', 'error', 'seguidores')
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+        self.seguidores = 0
+
+
+class SingleFlight:
+    """Agrupa lecturas idénticas concurrentes en una sola.
+
+    La primera llamada a `do(clave, funcion)` ejecuta `funcion`; las que
+    llegan con la misma clave mientras tanto esperan y reciben su resultado
+    (o su excepción). Cuando hubo espera, cada llamador recibe una copia
+    propia para poder modificarla sin afectar a los demás; con
+    `copiar=False` (resultados de solo lectura) todos reciben el mismo objeto.
+    """
+
+    def __init__(self, nombre, copiar=True):
+        self.nombre = nombre
+        self.copiar = copiar
+        self._vuelos = {}
+        self._lock = threading.Lock()
+
+    def do(self, clave, funcion):
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = _Vuelo()
+                self._vuelos[clave] = vuelo
+            else:
+                vuelo.seguidores += 1
+
+        if not lider:
+            metrics.single_flight_shared.inc(self.nombre)
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return copy.deepcopy(vuelo.resultado) if self.copiar else vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+        except Exception as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+                compartido = vuelo.seguidores > 0
+            vuelo.listo.set()
+        return copy.deepcopy(vuelo.resultado) if compartido and self.copiar else vuelo.resultado
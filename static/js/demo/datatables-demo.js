@@ -1,4 +1,4 @@
 // Call the dataTables jQuery plugin
 $(document).ready(function() {
-  $('#dataTable').DataTable();
+  $('#dataTable:not([data-ajax-url])').DataTable();
 });
@@ -0,0 +1,152 @@
+// Tabla de pedidos paginada en el servidor con cursores (ver /pedidos/data)
+$(document).ready(function() {
+  var $tabla = $('#dataTable[data-ajax-url]');
+  if (!$tabla.length) {
+    return;
+  }
+
+  // Cursor que devuelve el servidor para cada inicio de página y orden.
+  var cursores = {};
+  var ordenActual = null;
+  // IDs marcados; se conservan al cambiar de página.
+  var seleccionados = {};
+
+  var tabla = $tabla.DataTable({
+    serverSide: true,
+    processing: true,
+    searching: false,
+    // Sin orden inicial: el servidor ordena por ID e incluye los pedidos sin fecha.
+    order: [],
+    columns: [
+      {
+        data: 'id',
+        orderable: false,
+        render: function(data) {
+          var $check = $('<input type="checkbox" class="seleccion-pedido">').attr('value', data);
+          if (seleccionados[data]) {
+            $check.attr('checked', 'checked');
+          }
+          return $check.prop('outerHTML');
+        }
+      },
+      { data: 'userId', orderable: false, render: $.fn.dataTable.render.text() },
+      { data: 'prod', orderable: false, render: $.fn.dataTable.render.text() },
+      { data: 'status', render: $.fn.dataTable.render.text() },
+      { data: 'createdAt', render: $.fn.dataTable.render.text() },
+      {
+        data: null,
+        orderable: false,
+        render: function(data, type, row) {
+          var $acciones = $('<div>');
+          $('<a class="btn btn-warning btn-sm">Editar</a>').attr('href', row.editar_url).appendTo($acciones);
+          var $form = $('<form method="post" style="display:inline;">').attr('action', row.eliminar_url);
+          $('<button type="submit" class="btn btn-danger btn-sm">Borrar</button>')
+            .attr('onclick', "return confirm('¿Estás seguro de que deseas eliminar este pedido?')")
+            .appendTo($form);
+          $acciones.append(' ').append($form);
+          return $acciones.html();
+        }
+      }
+    ],
+    ajax: {
+      url: $tabla.data('ajax-url'),
+      data: function(params) {
+        var orden = JSON.stringify(params.order);
+        if (orden !== ordenActual) {
+          cursores = {};
+          ordenActual = orden;
+        }
+        if (cursores[params.start]) {
+          params.cursor = cursores[params.start];
+        }
+        $tabla.data('inicio-solicitado', params.start + params.length);
+      },
+      dataSrc: function(json) {
+        if (json.cursor) {
+          cursores[$tabla.data('inicio-solicitado')] = json.cursor;
+        }
+        return json.data;
+      }
+    },
+    language: {
+      emptyTable: 'No hay pedidos disponibles.'
+    }
+  });
+
+  function actualizarSeleccion() {
+    var total = Object.keys(seleccionados).length;
+    $('#totalSeleccionados').text(total);
+    $('#accionesLote button').prop('disabled', total === 0);
+    var $checks = $tabla.find('tbody .seleccion-pedido');
+    $('#seleccionarPagina').prop('checked', $checks.length > 0 && $checks.filter(':checked').length === $checks.length);
+  }
+
+  $tabla.on('change', '.seleccion-pedido', function() {
+    if (this.checked) {
+      seleccionados[this.value] = true;
+    } else {
+      delete seleccionados[this.value];
+    }
+    actualizarSeleccion();
+  });
+
+  $('#seleccionarPagina').on('change', function() {
+    var marcar = this.checked;
+    $tabla.find('tbody .seleccion-pedido').each(function() {
+      this.checked = marcar;
+      if (marcar) {
+        seleccionados[this.value] = true;
+      } else {
+        delete seleccionados[this.value];
+      }
+    });
+    actualizarSeleccion();
+  });
+
+  $tabla.on('draw.dt', actualizarSeleccion);
+
+  $('#accionesLote').on('click', 'button[data-accion]', function() {
+    var accion = $(this).data('accion');
+    var ids = Object.keys(seleccionados);
+    if (!ids.length) {
+      return;
+    }
+    if (accion === 'eliminar' && !confirm('¿Estás seguro de que deseas eliminar ' + ids.length + ' pedidos?')) {
+      return;
+    }
+
+    $('#accionesLote button').prop('disabled', true);
+    $.ajax({
+      url: $tabla.data('lote-url'),
+      method: 'POST',
+      contentType: 'application/json',
+      data: JSON.stringify({ accion: accion, ids: ids })
+    }).done(function(respuesta) {
+      var $resultado = $('<div class="alert">')
+        .addClass(respuesta.fallidos ? 'alert-warning' : 'alert-success')
+        .text(respuesta.exitosos + ' pedidos procesados, ' + respuesta.fallidos + ' con error.');
+      if (respuesta.fallidos) {
+        var $lista = $('<ul class="mb-0">');
+        seleccionados = {};
+        $.each(respuesta.resultados, function(_, resultado) {
+          if (!resultado.ok) {
+            seleccionados[resultado.id] = true;
+            $('<li>').text(resultado.id + ': ' + resultado.error).appendTo($lista);
+          }
+        });
+        $resultado.append($lista);
+      } else {
+        seleccionados = {};
+      }
+      $('#resultadoLote').empty().append($resultado);
+    }).fail(function(xhr) {
+      var mensaje = (xhr.responseJSON && xhr.responseJSON.message) || 'Error al procesar el lote.';
+      $('#resultadoLote').empty().append($('<div class="alert alert-danger">').text(mensaje));
+    }).always(function() {
+      // Las escrituras cambian el orden y el total, así que los cursores ya no sirven.
+      cursores = {};
+      tabla.ajax.reload();
+      actualizarSeleccion();
+    });
+  });
+});
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import unittest
+from unittest import mock
+
+import requests
+from flask import Flask, session
+
+from api_client import APIClient, metric_endpoint
+
+
+class _Respuesta:
+
+    def __init__(self, status_code, datos=None):
+        self.status_code = status_code
+        self._datos = datos
+        self.content = json.dumps(datos).encode()
+
+    def json(self):
+        return self._datos
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class MetricEndpointTest(unittest.TestCase):
+
+    def test_conserva_recurso_y_operacion(self):
+        self.assertEqual(metric_endpoint('empleados/getEmpleados'), 'empleados/getEmpleados')
+        self.assertEqual(
+            metric_endpoint('dispositivos/getAllDispositivos'), 'dispositivos/getAllDispositivos'
+        )
+
+    def test_reemplaza_los_ids_despues_de_la_operacion(self):
+        self.assertEqual(metric_endpoint('empleados/getEmpleado/abcDEF123'), 'empleados/getEmpleado/:id')
+        self.assertEqual(metric_endpoint('x/getX/uidAbc/fooBar'), 'x/getX/:id/:id')
+
+    def test_los_recursos_por_registro_no_conservan_el_id(self):
+        self.assertEqual(metric_endpoint('usuarios/abc123'), 'usuarios/:id')
+        self.assertEqual(metric_endpoint('usuarios/kX9aBcD3fGhUid'), 'usuarios/:id')
+
+    def test_distintos_registros_comparten_la_misma_serie(self):
+        uids = ['a1', 'bB2', 'zZ9q', 'Qw3Er4']
+        self.assertEqual({metric_endpoint(f'usuarios/{uid}') for uid in uids}, {'usuarios/:id'})
+
+
+
+class APIClientGetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        contexto = self.app.test_request_context()
+        contexto.push()
+        self.addCleanup(contexto.pop)
+        session['idToken'] = 'token'
+
+        self.cliente = APIClient('http://backend', max_retries=0, backoff=0,
+                                 cache_ttls={'dispositivos/': 30})
+        self.respuestas = []
+        http = mock.MagicMock()
+        http.request.side_effect = lambda *args, **kwargs: self.respuesta()
+        parche = mock.patch.object(self.cliente, '_get_session', return_value=http)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def respuesta(self):
+        respuesta = self.respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    def test_los_hits_de_cache_no_copian_la_respuesta(self):
+        self.respuestas = [_Respuesta(200, [{'id': 'd1'}])]
+        primera = self.cliente.get('dispositivos/getAllDispositivos')
+        self.assertIs(self.cliente.get('dispositivos/getAllDispositivos'), primera)
+
+    def test_get_by_id_devuelve_una_copia_propia_del_registro(self):
+        self.respuestas = [_Respuesta(200, [{'id': 'd1', 'usuarios_invitados': ['u1']}])]
+        registro = self.cliente.get_by_id('dispositivos/getAllDispositivos', 'd1')
+        registro['usuarios_invitados'] = ['correo@x']
+
+        self.assertEqual(
+            self.cliente.get_by_id('dispositivos/getAllDispositivos', 'd1')['usuarios_invitados'], ['u1']
+        )
+        self.assertEqual(self.cliente.get('dispositivos/getAllDispositivos')[0]['usuarios_invitados'], ['u1'])
+
+    def test_la_marca_es_el_hash_del_cuerpo(self):
+        respuesta = _Respuesta(200, [{'id': 'd1'}])
+        self.respuestas = [respuesta]
+        self.cliente.get('dispositivos/getAllDispositivos')
+        huella, _ = self.cliente.marca('dispositivos/getAllDispositivos')
+        self.assertEqual(huella, hashlib.sha256(respuesta.content).hexdigest()[:32])
+
+    def test_sirve_la_ultima_respuesta_buena_solo_ante_fallas_transitorias(self):
+        self.cliente.cache_ttls = {}
+        self.respuestas = [
+            _Respuesta(200, ['v1']),
+            _Respuesta(503),
+            requests.exceptions.ConnectionError('sin red'),
+            _Respuesta(401),
+            _Respuesta(503),
+        ]
+        self.assertEqual(self.cliente.get('empleados/getEmpleados'), ['v1'])
+        self.assertEqual(self.cliente.get('empleados/getEmpleados'), ['v1'])
+        self.assertEqual(self.cliente.get('empleados/getEmpleados'), ['v1'])
+        self.assertIsNone(self.cliente.get('empleados/getEmpleados'))
+        # El 401 descartó la última respuesta buena.
+        self.assertIsNone(self.cliente.get('empleados/getEmpleados'))
+
+    def test_las_escrituras_descartan_la_ultima_respuesta_buena(self):
+        self.cliente.cache_ttls = {}
+        self.respuestas = [_Respuesta(200, ['v1']), _Respuesta(200, {}), _Respuesta(502)]
+        self.cliente.get('empleados/getEmpleados')
+        self.cliente.post('empleados/createEmpleado', json={})
+        self.assertIsNone(self.cliente.get('empleados/getEmpleados'))
+
+
+if __name__ == '__main__':
+    unittest.main()
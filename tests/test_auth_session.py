@@ -0,0 +1,83 @@
+import time
+import unittest
+from unittest import mock
+
+from auth_session import AuthManager
+
+
+class _Snapshot:
+
+    def __init__(self, datos):
+        self._datos = datos
+        self.exists = datos is not None
+
+    def get(self, campo):
+        return self._datos[campo]
+
+
+class _Documento:
+
+    def __init__(self, almacen, clave):
+        self._almacen = almacen
+        self._clave = clave
+
+    def set(self, datos):
+        self._almacen[self._clave] = dict(datos)
+
+    def get(self):
+        return _Snapshot(self._almacen.get(self._clave))
+
+    def update(self, cambios):
+        self._almacen[self._clave].update(cambios)
+
+    def delete(self):
+        self._almacen.pop(self._clave, None)
+
+
+class AuthManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sesiones = {}
+        db = mock.MagicMock()
+        db.collection.return_value.document.side_effect = lambda clave: _Documento(self.sesiones, clave)
+        self.pyrebase = mock.MagicMock()
+        self.pyrebase.refresh.return_value = {'idToken': 'token-2', 'refreshToken': 'refresh-2'}
+        self.manager = AuthManager(db, self.pyrebase)
+        self.perfil = {'nombre': 'Ana', 'is_admin': True}
+        self.manager.verificar = lambda token: {'uid': 'u1', 'email': 'ana@x', 'exp': time.time() + 3600}
+        self.manager.perfil = lambda uid, email: dict(self.perfil)
+        self.session = {}
+        self.manager.iniciar(self.session, {'idToken': 'token-1', 'refreshToken': 'refresh-1'})
+
+    def test_el_refresh_token_no_queda_en_la_sesion(self):
+        self.assertNotIn('refreshToken', self.session)
+        self.assertIn('sid', self.session)
+        self.assertEqual([s['refresh_token'] for s in self.sesiones.values()], ['refresh-1'])
+
+    def test_refresca_con_el_token_guardado(self):
+        self.session['tokenExp'] = 0
+
+        self.assertTrue(self.manager.validar(self.session))
+
+        self.pyrebase.refresh.assert_called_once_with('refresh-1')
+        self.assertEqual(self.session['idToken'], 'token-2')
+        self.assertEqual([s['refresh_token'] for s in self.sesiones.values()], ['refresh-2'])
+
+    def test_un_cambio_de_nombre_actualiza_la_sesion_sin_cerrarla(self):
+        self.perfil['nombre'] = 'Ana María'
+
+        self.assertTrue(self.manager.validar(self.session))
+
+        self.assertEqual(self.session['nombreEmpleado'], 'Ana María')
+        self.assertEqual(self.session['idToken'], 'token-1')
+        self.assertTrue(self.session['is_admin'])
+        self.assertEqual(len(self.sesiones), 1)
+
+    def test_cerrar_borra_el_token_guardado(self):
+        self.manager.cerrar(self.session)
+        self.assertEqual(self.session, {})
+        self.assertEqual(self.sesiones, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+from catalog_forms import validar_plan, validar_producto
+from catalog_import import CatalogImporter, leer_filas
+
+
+class ValidadoresTest(unittest.TestCase):
+
+    def test_validar_producto_convierte_el_precio(self):
+        datos = validar_producto({'titulo': 't', 'descripcion': 'd', 'precio': '10.5'})
+        self.assertEqual(datos['precio'], 10.5)
+
+    def test_precios_no_numericos_son_valueerror(self):
+        for precio in ('abc', [1], {'a': 1}):
+            with self.subTest(precio=precio):
+                with self.assertRaises(ValueError):
+                    validar_producto({'titulo': 't', 'descripcion': 'd', 'precio': precio})
+                with self.assertRaises(ValueError):
+                    validar_plan({'nombre': 'n', 'descripcion': 'd', 'precio': precio,
+                                  'refresco': 1, 'cantidad_compartidos': 1})
+
+
+class CatalogImporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.importador = CatalogImporter(mock.MagicMock(), None, 'productos')
+        parche = mock.patch('catalog_import.firestore_batch.escribir_en_lote',
+                            side_effect=lambda db, operaciones: {op[0]: None for op in operaciones})
+        parche.start()
+        self.addCleanup(parche.stop)
+        # Sin descargas: cada imagen solo libera su hueco en la cola.
+        parche = mock.patch.object(CatalogImporter, '_subir_imagen',
+                                   lambda importador, *args: importador._huecos.release())
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def importar_ndjson(self, filas):
+        contenido = '\n'.join(json.dumps(fila) for fila in filas).encode()
+        return self.importador.importar(leer_filas(io.BytesIO(contenido), 'ndjson'))
+
+    def test_valores_de_tipo_inesperado_solo_invalidan_su_fila(self):
+        valida = {'titulo': 't', 'descripcion': 'd', 'precio': 1, 'imagen': 'a.png'}
+        progreso = self.importar_ndjson([
+            valida,
+            {**valida, 'imagen': 123},
+            {**valida, 'precio': [1]},
+            {**valida, 'titulo': ['x'], 'imagen': {'url': 'a.png'}},
+            valida,
+        ])
+
+        self.assertEqual(progreso.estado, 'listo')
+        self.assertEqual(progreso.filas, 5)
+        self.assertEqual(progreso.importadas, 2)
+        self.assertEqual([error['fila'] for error in progreso.errores], [2, 3, 4])
+
+    def test_lineas_que_no_son_objetos_cuentan_como_error(self):
+        contenido = b'[1, 2]\n{"titulo": "t"\n'
+        progreso = self.importador.importar(leer_filas(io.BytesIO(contenido), 'ndjson'))
+        self.assertEqual(progreso.estado, 'listo')
+        self.assertEqual(progreso.fallidas, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
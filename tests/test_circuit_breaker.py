@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+
+from circuit_breaker import ABIERTO, CERRADO, SEMIABIERTO, CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ahora = 1000.0
+        parche = mock.patch('circuit_breaker.time.monotonic', side_effect=lambda: self.ahora)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.breaker = CircuitBreaker('prueba', umbral_fallos=3, espera=30)
+
+    def abrir(self):
+        for _ in range(3):
+            self.breaker.fallo()
+
+    def test_se_abre_tras_el_umbral_de_fallos_seguidos(self):
+        self.breaker.fallo()
+        self.breaker.fallo()
+        self.assertEqual(self.breaker.estado, CERRADO)
+        self.assertTrue(self.breaker.permitir())
+
+        self.breaker.fallo()
+        self.assertEqual(self.breaker.estado, ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+
+    def test_un_exito_reinicia_la_cuenta_de_fallos(self):
+        self.breaker.fallo()
+        self.breaker.fallo()
+        self.breaker.exito()
+        self.breaker.fallo()
+        self.assertEqual(self.breaker.estado, CERRADO)
+
+    def test_pasada_la_espera_deja_pasar_una_sola_prueba(self):
+        self.abrir()
+        self.ahora += 30
+        self.assertEqual(self.breaker.estado, SEMIABIERTO)
+
+        self.assertTrue(self.breaker.permitir())
+        self.assertFalse(self.breaker.permitir())
+
+    def test_la_prueba_exitosa_cierra_el_circuito(self):
+        self.abrir()
+        self.ahora += 30
+        self.breaker.permitir()
+        self.breaker.exito()
+
+        self.assertEqual(self.breaker.estado, CERRADO)
+        self.assertTrue(self.breaker.permitir())
+        self.assertTrue(self.breaker.permitir())
+
+    def test_la_prueba_fallida_vuelve_a_abrir_el_circuito(self):
+        self.abrir()
+        self.ahora += 30
+        self.breaker.permitir()
+        self.breaker.fallo()
+
+        self.assertEqual(self.breaker.estado, ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+        self.ahora += 29
+        self.assertFalse(self.breaker.permitir())
+        self.ahora += 1
+        self.assertTrue(self.breaker.permitir())
+
+
+if __name__ == '__main__':
+    unittest.main()
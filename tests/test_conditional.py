@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+import conditional
+
+
+MODIFICADO = datetime(2024, 5, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+
+
+class ConditionalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        with self.app.test_request_context():
+            self.etag = conditional.etag('v1')
+
+    def contexto(self, **headers):
+        return self.app.test_request_context(headers=headers)
+
+    def test_sin_version_no_responde_304(self):
+        with self.contexto(**{'If-None-Match': '"x"'}):
+            self.assertIsNone(conditional.sin_cambios(None))
+
+    def test_responde_304_si_el_etag_coincide(self):
+        with self.contexto(**{'If-None-Match': f'"{self.etag}"'}):
+            respuesta = conditional.sin_cambios(('v1', MODIFICADO))
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.headers['ETag'], f'"{self.etag}"')
+        self.assertEqual(respuesta.headers['Cache-Control'], 'private, no-cache')
+
+    def test_no_responde_304_si_el_etag_es_otro(self):
+        with self.contexto(**{'If-None-Match': f'"{self.etag}"'}):
+            self.assertIsNone(conditional.sin_cambios(('v2', MODIFICADO)))
+
+    def test_if_none_match_tiene_prioridad_sobre_if_modified_since(self):
+        with self.contexto(**{'If-None-Match': '"otro"', 'If-Modified-Since': 'Wed, 01 May 2030 00:00:00 GMT'}):
+            self.assertIsNone(conditional.sin_cambios(('v1', MODIFICADO)))
+
+    def test_if_modified_since_ignora_los_microsegundos(self):
+        with self.contexto(**{'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}):
+            self.assertEqual(conditional.sin_cambios(('v1', MODIFICADO)).status_code, 304)
+            self.assertIsNone(conditional.sin_cambios(('v1', MODIFICADO + timedelta(seconds=1))))
+
+    def test_el_etag_depende_de_la_sesion(self):
+        with self.app.test_request_context() as contexto:
+            contexto.session['is_admin'] = True
+            self.assertNotEqual(conditional.etag('v1'), self.etag)
+
+    def test_versionar_agrega_validadores_solo_a_respuestas_200(self):
+        with self.contexto():
+            ok = conditional.versionar('<p>ok</p>', ('v1', MODIFICADO))
+            error = conditional.versionar(('error', 500), ('v1', MODIFICADO))
+        self.assertEqual(ok.headers['ETag'], f'"{self.etag}"')
+        self.assertIn('Last-Modified', ok.headers)
+        self.assertNotIn('ETag', error.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
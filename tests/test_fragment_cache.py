@@ -0,0 +1,117 @@
+import unittest
+
+from flask import Flask, session
+from markupsafe import Markup
+
+import metrics
+from fragment_cache import FragmentCache
+
+
+class FragmentCacheLRUTest(unittest.TestCase):
+
+    def test_descarta_la_entrada_menos_usada_al_superar_max_entries(self):
+        cache = FragmentCache(max_entries=2)
+        cache._set(('a',), 'A')
+        cache._set(('b',), 'B')
+        cache._get(('a',))
+        cache._set(('c',), 'C')
+
+        self.assertEqual(cache._get(('a',)), 'A')
+        self.assertIsNone(cache._get(('b',)))
+        self.assertEqual(cache._get(('c',)), 'C')
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_cuenta_bytes_utf8_y_no_caracteres(self):
+        cache = FragmentCache(max_bytes=10)
+        cache._set(('a',), 'ñññññ')  # 5 caracteres, 10 bytes
+        self.assertEqual(cache.stats()['bytes'], 10)
+
+        cache._set(('b',), 'x')
+        self.assertIsNone(cache._get(('a',)))
+        self.assertEqual(cache.stats(), {'entries': 1, 'bytes': 1})
+
+    def test_no_guarda_fragmentos_mayores_que_max_bytes(self):
+        cache = FragmentCache(max_bytes=4)
+        cache._set(('a',), 'ñññ')
+        self.assertIsNone(cache._get(('a',)))
+        self.assertEqual(cache.stats(), {'entries': 0, 'bytes': 0})
+
+    def test_reemplazar_una_clave_no_duplica_su_tamano(self):
+        cache = FragmentCache()
+        cache._set(('a',), 'abc')
+        cache._set(('a',), 'ab')
+        self.assertEqual(cache.stats(), {'entries': 1, 'bytes': 2})
+
+    def test_invalidar_descarta_solo_el_nombre_indicado(self):
+        cache = FragmentCache()
+        cache._set(('planes', 0, 'v1', False), 'P')
+        cache._set(('productos', 0, 'v1', False), 'Q')
+
+        cache.invalidar('planes')
+
+        self.assertIsNone(cache._get(('planes', 0, 'v1', False)))
+        self.assertEqual(cache._get(('productos', 0, 'v1', False)), 'Q')
+        self.assertEqual(cache.stats()['bytes'], 1)
+
+
+class FragmentoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.cache = FragmentCache()
+        self.renders = 0
+
+    def caller(self):
+        self.renders += 1
+        return Markup(f"<tr><td>{self.renders}</td></tr>")
+
+    def test_reutiliza_el_render_mientras_no_cambie_la_version(self):
+        hits = metrics.fragment_cache_requests.valor('prueba-hit', 'hit')
+        with self.app.test_request_context():
+            primero = self.cache.fragmento('prueba-hit', 'v1', self.caller)
+            segundo = self.cache.fragmento('prueba-hit', 'v1', self.caller)
+            tercero = self.cache.fragmento('prueba-hit', 'v2', self.caller)
+
+        self.assertEqual(primero, segundo)
+        self.assertIsInstance(segundo, Markup)
+        self.assertNotEqual(primero, tercero)
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(metrics.fragment_cache_requests.valor('prueba-hit', 'hit'), hits + 1)
+
+    def test_sin_version_siempre_renderiza(self):
+        with self.app.test_request_context():
+            self.cache.fragmento('prueba', None, self.caller)
+            self.cache.fragmento('prueba', None, self.caller)
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_separa_la_variante_de_administrador(self):
+        with self.app.test_request_context():
+            self.cache.fragmento('prueba', 'v1', self.caller)
+            session['is_admin'] = True
+            self.cache.fragmento('prueba', 'v1', self.caller)
+        self.assertEqual(self.renders, 2)
+
+    def test_invalida_solo_tras_un_post(self):
+        @self.cache.invalida('prueba')
+        def vista():
+            return 'ok'
+
+        with self.app.test_request_context():
+            self.cache.fragmento('prueba', 'v1', self.caller)
+        with self.app.test_request_context(method='GET'):
+            vista()
+        with self.app.test_request_context():
+            self.cache.fragmento('prueba', 'v1', self.caller)
+        self.assertEqual(self.renders, 1)
+
+        with self.app.test_request_context(method='POST'):
+            vista()
+        with self.app.test_request_context():
+            self.cache.fragmento('prueba', 'v1', self.caller)
+        self.assertEqual(self.renders, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
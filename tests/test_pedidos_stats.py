@@ -0,0 +1,73 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pedidos_stats import PedidosStats
+
+
+def _cambio(tipo, id_pedido, datos=None):
+    documento = SimpleNamespace(id=id_pedido, to_dict=lambda: datos)
+    return SimpleNamespace(type=SimpleNamespace(name=tipo), document=documento)
+
+
+class PedidosStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ahora = 1000.0
+        parche = mock.patch('pedidos_stats.time.monotonic', side_effect=lambda: self.ahora)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        self.watches = []
+        self.callbacks = []
+        db = mock.MagicMock()
+        db.collection.return_value.on_snapshot.side_effect = self.registrar_watch
+        self.stats = PedidosStats(db, reintento=30)
+        self.stats.iniciar()
+
+    def registrar_watch(self, callback):
+        watch = SimpleNamespace(is_active=True, unsubscribe=mock.MagicMock())
+        self.watches.append(watch)
+        self.callbacks.append(callback)
+        return watch
+
+    def test_sin_instantanea_inicial_no_hay_resumen(self):
+        self.assertIsNone(self.stats.resumen())
+
+    def test_aplica_los_cambios_de_las_instantaneas(self):
+        self.callbacks[0](None, [
+            _cambio('ADDED', 'p1', {'is_entregado': True}),
+            _cambio('ADDED', 'p2', {'is_entregado': False}),
+        ], None)
+        self.assertEqual(self.stats.resumen(), (2, 1, 1))
+
+        self.callbacks[0](None, [_cambio('MODIFIED', 'p2', {'is_entregado': True}),
+                                 _cambio('REMOVED', 'p1')], None)
+        self.assertEqual(self.stats.resumen(), (1, 1, 0))
+
+    def test_un_listener_caido_deja_de_servir_totales_y_se_vuelve_a_registrar(self):
+        self.callbacks[0](None, [_cambio('ADDED', 'p1', {'is_entregado': True})], None)
+        self.watches[0].is_active = False
+
+        self.assertFalse(self.stats.listo)
+        self.assertIsNone(self.stats.resumen())
+        self.assertEqual(len(self.watches), 1)
+
+        self.ahora += 30
+        self.assertIsNone(self.stats.resumen())
+        self.assertEqual(len(self.watches), 2)
+        self.watches[0].unsubscribe.assert_called_once()
+
+        # La nueva instantánea inicial reemplaza los totales anteriores.
+        self.callbacks[1](None, [_cambio('ADDED', 'p2', {'is_entregado': False})], None)
+        self.assertEqual(self.stats.resumen(), (1, 0, 1))
+
+    def test_detener_invalida_los_totales(self):
+        self.callbacks[0](None, [_cambio('ADDED', 'p1', {'is_entregado': True})], None)
+        self.stats.detener()
+        self.assertFalse(self.stats.listo)
+        self.watches[0].unsubscribe.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+
+from response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ahora = 1000.0
+        parche = mock.patch('response_cache.time.monotonic', side_effect=lambda: self.ahora)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.cache = ResponseCache(max_entries=2)
+
+    def test_vence_al_cumplirse_el_ttl(self):
+        self.cache.set('a', [1], ttl=10)
+        self.ahora += 9
+        self.assertEqual(self.cache.get('a'), [1])
+        self.ahora += 1
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_descarta_la_entrada_menos_usada(self):
+        self.cache.set('a', 1, ttl=60)
+        self.cache.set('b', 2, ttl=60)
+        self.cache.get('a')
+        self.cache.set('c', 3, ttl=60)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_comparte_el_valor_sin_copiarlo(self):
+        valor = {'datos': [1]}
+        self.cache.set('a', valor, ttl=60)
+        self.assertIs(self.cache.get('a'), valor)
+        self.assertIs(self.cache.get_item('a', 'datos')[1], valor['datos'])
+
+    def test_get_item_busca_dentro_de_un_indice(self):
+        self.cache.set('indice', {'x': {'id': 'x'}}, ttl=60)
+        self.assertEqual(self.cache.get_item('indice', 'x'), (True, {'id': 'x'}))
+        self.assertEqual(self.cache.get_item('indice', 'y'), (True, None))
+        self.assertEqual(self.cache.get_item('otro', 'x'), (False, None))
+
+    def test_invalidate_descarta_por_predicado(self):
+        self.cache.set(('t', 'planes/getPlanes'), 1, ttl=60)
+        self.cache.set(('t', 'empleados/getEmpleados'), 2, ttl=60)
+
+        descartadas = self.cache.invalidate(lambda clave: clave[1].startswith('planes/'))
+
+        self.assertEqual(descartadas, 1)
+        self.assertIsNone(self.cache.get(('t', 'planes/getPlanes')))
+        self.assertEqual(self.cache.get(('t', 'empleados/getEmpleados')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
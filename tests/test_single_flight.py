@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+import metrics
+from single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vuelos = SingleFlight('prueba')
+
+    def lanzar_seguidor(self, clave, resultados):
+        """Arranca una llamada concurrente y espera a que quede registrada como seguidora."""
+        compartidas = metrics.single_flight_shared.valor('prueba')
+
+        def seguidor():
+            try:
+                resultados.append(self.vuelos.do(clave, lambda: self.fail("el seguidor no debe ejecutar")))
+            except Exception as e:
+                resultados.append(e)
+
+        hilo = threading.Thread(target=seguidor)
+        hilo.start()
+        while metrics.single_flight_shared.valor('prueba') == compartidas:
+            time.sleep(0.001)
+        return hilo
+
+    def test_las_llamadas_concurrentes_comparten_una_ejecucion(self):
+        resultados = []
+        llamadas = []
+        hilos = []
+
+        def lider():
+            llamadas.append(1)
+            hilos.append(self.lanzar_seguidor('k', resultados))
+            hilos.append(self.lanzar_seguidor('k', resultados))
+            return {'datos': [1]}
+
+        propio = self.vuelos.do('k', lider)
+        for hilo in hilos:
+            hilo.join(5)
+
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(propio, {'datos': [1]})
+        self.assertEqual(resultados, [{'datos': [1]}, {'datos': [1]}])
+        # Cada llamador recibe su propia copia.
+        resultados[0]['datos'].append(2)
+        self.assertEqual(propio, {'datos': [1]})
+        self.assertEqual(resultados[1], {'datos': [1]})
+
+    def test_el_error_del_lider_llega_a_los_seguidores(self):
+        resultados = []
+        hilos = []
+
+        def lider():
+            hilos.append(self.lanzar_seguidor('k', resultados))
+            raise RuntimeError('backend caído')
+
+        with self.assertRaises(RuntimeError):
+            self.vuelos.do('k', lider)
+        hilos[0].join(5)
+
+        self.assertIsInstance(resultados[0], RuntimeError)
+
+    def test_sin_copia_todos_reciben_el_mismo_objeto(self):
+        self.vuelos = SingleFlight('prueba', copiar=False)
+        resultados = []
+        hilos = []
+        valor = {'datos': [1]}
+
+        def lider():
+            hilos.append(self.lanzar_seguidor('k', resultados))
+            return valor
+
+        self.assertIs(self.vuelos.do('k', lider), valor)
+        hilos[0].join(5)
+        self.assertIs(resultados[0], valor)
+
+    def test_sin_concurrencia_cada_llamada_ejecuta_y_no_copia(self):
+        valor = {'datos': []}
+        llamadas = []
+
+        def funcion():
+            llamadas.append(1)
+            return valor
+
+        self.assertIs(self.vuelos.do('k', funcion), valor)
+        self.assertIs(self.vuelos.do('k', funcion), valor)
+        self.assertEqual(len(llamadas), 2)
+
+    def test_claves_distintas_no_se_agrupan(self):
+        self.assertEqual(self.vuelos.do('a', lambda: 'a'), 'a')
+        self.assertEqual(self.vuelos.do('b', lambda: 'b'), 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class UploadQueueFull(Exception):
+    """La cola de subidas alcanzó su límite de trabajos pendientes."""
+
+
+class UploadQueue:
+    """Ejecuta subidas a Storage en un pool de hilos acotado.
+
+    Cada trabajo queda registrado en una tabla con su estado (`pendiente`,
+    `procesando`, `listo` o `error`) para poder consultarlo después. Si hay
+    `max_pending` trabajos sin terminar, `submit` lanza UploadQueueFull y
+    el llamador decide cómo frenar.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, max_retries=3, backoff=1.0, max_jobs=500):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-queue")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, tarea, descripcion=None, al_fallar=None):
+        """Encola `tarea` (callable sin argumentos) y devuelve el ID del trabajo.
+
+        `al_fallar(error)` se llama si la tarea sigue fallando tras agotar
+        los reintentos.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise UploadQueueFull("Hay demasiadas subidas pendientes.")
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'descripcion': descripcion,
+                'estado': 'pendiente',
+                'intentos': 0,
+                'error': None,
+                'creado': time.time(),
+                'terminado': None,
+            }
+            self._podar()
+
+        try:
+            self._executor.submit(self._ejecutar, job_id, tarea, al_fallar)
+        except Exception:
+            self._slots.release()
+            raise
+        return job_id
+
+    def _actualizar(self, job_id, **cambios):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(cambios)
+
+    def _ejecutar(self, job_id, tarea, al_fallar):
+        ultimo_error = None
+        try:
+            for intento in range(1, self.max_retries + 1):
+                self._actualizar(job_id, estado='procesando', intentos=intento)
+                try:
+                    tarea()
+                    self._actualizar(job_id, estado='listo', error=None, terminado=time.time())
+                    return
+                except Exception as e:
+                    logger.warning("Error en la subida %s (intento %s): %s", job_id, intento, e)
+                    ultimo_error = str(e)
+                    self._actualizar(job_id, error=ultimo_error)
+                    if intento < self.max_retries:
+                        time.sleep(self.backoff * 2 ** (intento - 1))
+
+            self._actualizar(job_id, estado='error', terminado=time.time())
+            if al_fallar is not None:
+                try:
+                    al_fallar(ultimo_error)
+                except Exception as e:
+                    logger.error("Error al registrar el fallo de la subida %s: %s", job_id, e)
+        finally:
+            self._slots.release()
+
+    def _podar(self):
+        """Descarta los trabajos terminados más antiguos por encima de `max_jobs`."""
+        exceso = len(self._jobs) - self.max_jobs
+        if exceso <= 0:
+            return
+        terminados = [job_id for job_id, job in self._jobs.items() if job['terminado'] is not None]
+        for job_id in terminados[:exceso]:
+            del self._jobs[job_id]
+
+    def estado(self, job_id):
+        """Copia del registro del trabajo o None si no existe."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def pendientes(self):
+        """Cantidad de trabajos que aún no terminaron."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['terminado'] is None)
@@ -0,0 +1,54 @@
+from functools import partial
+
+from response_cache import ResponseCache
+
+
+class UserResolver:
+    """Resuelve IDs de usuario a correos consultando la API en paralelo.
+
+    Los IDs repetidos se consultan una sola vez, las consultas pendientes se
+    reparten con `cargador` (ParallelLoader compartido) y los correos
+    obtenidos se recuerdan durante `ttl` segundos.
+    """
+
+    def __init__(self, api_client, cargador, ttl=300, max_entries=2048):
+        self.api_client = api_client
+        self.cargador = cargador
+        self.ttl = ttl
+        self.cache = ResponseCache(max_entries=max_entries)
+
+    def _fetch(self, user_id):
+        """Consulta el correo de un usuario en la API."""
+        user_response = self.api_client.get(f'usuarios/{user_id}')
+        if user_response and user_response.get('correo'):
+            return user_response['correo']
+        return None
+
+    def resolve(self, user_id):
+        """Devuelve el correo de `user_id` o None si no está disponible."""
+        return self.resolve_many([user_id]).get(user_id)
+
+    def resolve_many(self, ids):
+        """Devuelve {id: correo} para los IDs dados (None si no está disponible)."""
+        resultado = {}
+        pendientes = []
+        for user_id in dict.fromkeys(i for i in ids if i):
+            correo = self.cache.get(user_id)
+            if correo is not None:
+                resultado[user_id] = correo
+            else:
+                pendientes.append(user_id)
+
+        if not pendientes:
+            return resultado
+
+        # Las claves de gather son nombres de argumento; los IDs van por posición.
+        correos = self.cargador.gather(
+            **{f"u{i}": partial(self._fetch, user_id) for i, user_id in enumerate(pendientes)}
+        )
+        for i, user_id in enumerate(pendientes):
+            correo = correos.get(f"u{i}")
+            if correo is not None:
+                self.cache.set(user_id, correo, self.ttl)
+            resultado[user_id] = correo
+        return resultado